@@ -0,0 +1,184 @@
+import hashlib
+import io
+import logging
+import queue
+import threading
+
+import allure_commons
+from allure_commons import hookimpl
+from allure_commons.logger import AllureFileLogger
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FORMATS = {
+    "png": ("PNG", "png", "image/png"),
+    "jpeg": ("JPEG", "jpg", "image/jpeg"),
+    "webp": ("WEBP", "webp", "image/webp"),
+}
+
+
+class AttachmentSink:
+    # Подменяет AllureFileLogger: JSON результатов пишется как раньше,
+    # а содержимое вложений уходит в очередь фонового потока, который
+    # пишет их пачками, отбрасывает дубликаты по хешу содержимого,
+    # при необходимости пережимает PNG и следит за лимитом места на диске.
+    def __init__(self, file_logger, image_format=None, max_width=None, budget_bytes=0, batch_size=16):
+        self.file_logger = file_logger
+        self.image_format = image_format
+        self.max_width = max_width
+        self.budget_bytes = budget_bytes
+        self.batch_size = batch_size
+        self.written_bytes = 0
+        self._by_hash = {}
+        self._renamed = {}
+        self._dropped = set()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="allure-attachment-sink", daemon=True)
+        self._thread.start()
+
+        if (image_format or max_width) and Image is None:
+            logger.warning("Pillow is not installed, screenshots are stored without re-encoding")
+
+    @hookimpl
+    def report_attached_data(self, body, file_name):
+        self._queue.put((body, file_name))
+
+    @hookimpl
+    def report_attached_file(self, source, file_name):
+        self.file_logger.report_attached_file(source=source, file_name=file_name)
+
+    @hookimpl
+    def report_result(self, result):
+        self.flush()
+        self._relink(result)
+        self.file_logger.report_result(result=result)
+
+    @hookimpl
+    def report_container(self, container):
+        self.flush()
+        self._relink(container)
+        self.file_logger.report_container(container=container)
+
+    @hookimpl
+    def report_globals(self, globals_item):
+        self.flush()
+        self.file_logger.report_globals(globals_item=globals_item)
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        logger.info(f"Attachment sink wrote {self.written_bytes} bytes, "
+                    f"{len(self._renamed)} attachment(s) deduplicated or re-encoded, "
+                    f"{len(self._dropped)} dropped over budget")
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            for item in batch:
+                if item is None:
+                    continue
+                try:
+                    self._write(*item)
+                except Exception as e:
+                    logger.error(f"Could not write Allure attachment: {str(e)}")
+
+            for _ in batch:
+                self._queue.task_done()
+            if None in batch:
+                return
+
+    def _write(self, body, file_name):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        digest = hashlib.sha1(body).hexdigest()
+        with self._lock:
+            if digest in self._by_hash:
+                self._renamed[file_name] = self._by_hash[digest]
+                return
+
+        target, mime_type = file_name, None
+        if file_name.endswith(".png") and Image is not None and (self.image_format or self.max_width):
+            body, target, mime_type = self._reencode(body, file_name)
+
+        if self.budget_bytes and self.written_bytes + len(body) > self.budget_bytes:
+            logger.warning(f"Attachment budget exceeded, dropping {file_name}")
+            with self._lock:
+                self._dropped.add(file_name)
+            return
+
+        self.file_logger.report_attached_data(body=body, file_name=target)
+        self.written_bytes += len(body)
+        with self._lock:
+            self._by_hash[digest] = (target, mime_type)
+            if target != file_name:
+                self._renamed[file_name] = (target, mime_type)
+
+    def _reencode(self, body, file_name):
+        pil_format, extension, mime_type = IMAGE_FORMATS[self.image_format or "png"]
+        image = Image.open(io.BytesIO(body))
+        if self.max_width and image.width > self.max_width:
+            height = round(image.height * self.max_width / image.width)
+            image = image.resize((self.max_width, height))
+        if pil_format == "JPEG":
+            image = image.convert("RGB")
+
+        output = io.BytesIO()
+        image.save(output, format=pil_format, optimize=True, quality=80)
+        target = f"{file_name.rsplit('.', 1)[0]}.{extension}"
+        return output.getvalue(), target, mime_type
+
+    def _relink(self, item):
+        with self._lock:
+            if hasattr(item, "attachments") and item.attachments:
+                attachments = []
+                for attachment in item.attachments:
+                    if attachment.source in self._dropped:
+                        continue
+                    if attachment.source in self._renamed:
+                        attachment.source, mime_type = self._renamed[attachment.source]
+                        if mime_type:
+                            attachment.type = mime_type
+                    attachments.append(attachment)
+                item.attachments = attachments
+
+        for attribute in ("steps", "befores", "afters"):
+            for child in getattr(item, attribute, None) or []:
+                self._relink(child)
+
+
+def install_attachment_sink(config, image_format=None, max_width=None, budget_bytes=0):
+    manager = allure_commons.plugin_manager
+    file_logger = next((plugin for plugin in manager.get_plugins()
+                        if isinstance(plugin, AllureFileLogger)), None)
+    if file_logger is None:
+        return None
+
+    name = manager.get_name(file_logger)
+    manager.unregister(file_logger)
+    sink = AttachmentSink(file_logger, image_format, max_width, budget_bytes)
+    manager.register(sink)
+
+    def uninstall():
+        sink.close()
+        manager.unregister(sink)
+        # allure_pytest при завершении сам снимает регистрацию своего логгера
+        manager.register(file_logger, name)
+
+    config.add_cleanup(uninstall)
+    return sink
@@ -0,0 +1,120 @@
+import html
+import logging
+import random
+import re
+import string
+from urllib.parse import urlsplit
+
+import requests
+
+import urls
+from parallel import worker_id
+
+logger = logging.getLogger(__name__)
+
+
+class ShopApiError(Exception):
+    pass
+
+
+def generate_random_email():
+    # Идентификатор воркера исключает пересечение аккаунтов при параллельном запуске
+    letters = string.ascii_lowercase
+    username = ''.join(random.choice(letters) for _ in range(8))
+    return f"{username}.{worker_id()}@example.com"
+
+
+COOKIE_FIELDS = ("name", "value", "path", "secure", "httpOnly", "expiry")
+
+
+def inject_cookies(driver, cookies, base_url=None):
+    # Cookies можно выставить только находясь на домене магазина,
+    # поэтому сначала открываем самый лёгкий его адрес.
+    driver.get(f"{base_url or urls.base_url}robots.txt")
+    for cookie in cookies:
+        driver.add_cookie({field: cookie[field] for field in COOKIE_FIELDS if field in cookie})
+    logger.info(f"Injected {len(cookies)} session cookie(s) into browser")
+
+
+class ShopApi:
+    # Регистрация и вход напрямую через маршруты OpenCart, без заполнения форм в браузере
+    def __init__(self, base_url=None, timeout=30):
+        self.base_url = base_url or urls.base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    @classmethod
+    def from_cookies(cls, cookies, base_url=None, timeout=30):
+        api = cls(base_url, timeout)
+        host = urlsplit(api.base_url).hostname
+        for cookie in cookies:
+            api.session.cookies.set(cookie["name"], cookie["value"], domain=host, path=cookie.get("path", "/"))
+        return api
+
+    def url(self, route):
+        return urls.route_url(route, base=self.base_url)
+
+    def register(self, firstname, lastname, email, telephone, password):
+        logger.info(f"Registering user via HTTP: {email}")
+        response = self.session.post(self.url("account/register"), data={
+            "firstname": firstname,
+            "lastname": lastname,
+            "email": email,
+            "telephone": telephone,
+            "password": password,
+            "confirm": password,
+            "newsletter": "0",
+            "agree": "1",
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        # OpenCart сразу авторизует нового покупателя и перенаправляет на account/success
+        if "route=account/success" not in response.url:
+            raise ShopApiError(f"Registration of {email} was rejected, ended on {response.url}")
+        return response
+
+    def login(self, email, password):
+        logger.info(f"Logging in via HTTP: {email}")
+        response = self.session.post(self.url("account/login"), data={
+            "email": email,
+            "password": password,
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        if "route=account/account" not in response.url:
+            raise ShopApiError(f"Login of {email} was rejected, ended on {response.url}")
+        return response
+
+    def find_product_id(self, product_name):
+        response = self.session.get(self.url("product/search"), params={"search": product_name}, timeout=self.timeout)
+        response.raise_for_status()
+        for href, text in re.findall(r'<a href="([^"]*product_id=\d+[^"]*)"[^>]*>([^<]*)</a>', response.text):
+            if product_name in html.unescape(text):
+                return int(re.search(r"product_id=(\d+)", href).group(1))
+        raise ShopApiError(f"Product '{product_name}' not found in search results")
+
+    def add_to_cart(self, product_id, quantity=1):
+        logger.info(f"Adding product {product_id} x{quantity} to cart via HTTP")
+        response = self.session.post(self.url("checkout/cart/add"), data={
+            "product_id": product_id,
+            "quantity": quantity,
+        }, timeout=self.timeout)
+        response.raise_for_status()
+        result = response.json()
+        if "success" not in result:
+            raise ShopApiError(f"Product {product_id} was not added to cart: {result}")
+        return result
+
+    def cart_quantity(self, product_name):
+        # Мини-корзина в шапке отдаёт строки вида "<a>Название</a> ... x 3"
+        response = self.session.get(self.url("common/cart/info"), timeout=self.timeout)
+        response.raise_for_status()
+        match = re.search(re.escape(product_name) + r"\s*</a>.*?x\s*(\d+)", html.unescape(response.text), re.S)
+        return int(match.group(1)) if match else 0
+
+    def cookies(self):
+        return [
+            {"name": cookie.name, "value": cookie.value, "path": cookie.path or "/", "secure": cookie.secure}
+            for cookie in self.session.cookies
+        ]
+
+    def inject_session(self, driver):
+        inject_cookies(driver, self.cookies(), self.base_url)
@@ -0,0 +1,85 @@
+import logging
+import math
+from collections import defaultdict
+from contextlib import contextmanager
+from time import perf_counter
+
+import timing
+from jsonfile import read_json, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+METRICS = ("p50", "p95", "max")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def distribution(values):
+    return {
+        "runs": len(values),
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "max": round(max(values), 4),
+    }
+
+
+class BenchmarkRecorder:
+    # Длительность каждого прогона сценария плюс длительность шагов
+    # page-object методов, снятая с allure.step через timing.timer
+    def __init__(self):
+        self.journeys = defaultdict(list)
+        self.methods = defaultdict(lambda: defaultdict(list))
+
+    @contextmanager
+    def measure(self, journey):
+        first_record = len(timing.timer.records)
+        start = perf_counter()
+        yield
+        self.journeys[journey].append(perf_counter() - start)
+        for record in timing.timer.records[first_record:]:
+            self.methods[journey][record["step"].rsplit(" / ", 1)[-1]].append(record["duration"])
+
+    def results(self, journey):
+        return {
+            "journey": distribution(self.journeys[journey]),
+            "methods": {name: distribution(values) for name, values in sorted(self.methods[journey].items())},
+        }
+
+    def all_results(self):
+        return {journey: self.results(journey) for journey in sorted(self.journeys)}
+
+
+def load_baseline(path):
+    return read_json(path, {})
+
+
+def save_baseline(path, results):
+    baseline = load_baseline(path)
+    baseline.update(results)
+    write_json_atomic(path, baseline, indent=2)
+    logger.info(f"Benchmark baseline saved to {path}")
+
+
+def _compare(name, current, baseline, threshold, min_delta):
+    lines = []
+    for metric in METRICS:
+        before, after = baseline[metric], current[metric]
+        if after - before > min_delta and after > before * (1 + threshold):
+            lines.append(f"  {name}: {metric} {before:.3f}s -> {after:.3f}s (+{(after / before - 1) * 100:.0f}%)"
+                         if before else f"  {name}: {metric} {before:.3f}s -> {after:.3f}s")
+    return lines
+
+
+def regressions(journey, current, baseline, threshold, min_delta):
+    if journey not in baseline:
+        return []
+    lines = _compare(journey, current["journey"], baseline[journey]["journey"], threshold, min_delta)
+    for method, stats in current["methods"].items():
+        if method in baseline[journey]["methods"]:
+            lines.extend(_compare(f"{journey} / {method}", stats, baseline[journey]["methods"][method],
+                                  threshold, min_delta))
+    return lines
@@ -0,0 +1,143 @@
+import logging
+import os
+import threading
+from urllib.parse import quote
+
+from selenium import webdriver
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS = "analytics"
+IMAGES = "images"
+FONTS = "fonts"
+CATEGORIES = (ANALYTICS, IMAGES, FONTS)
+
+# Счётчики и трекеры, которые подключает демо-магазин и его тема
+ANALYTICS_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net", "mc.yandex.ru",
+    "top-fwz1.mail.ru", "counter.yadro.ru", "connect.facebook.net",
+)
+# Несуществующий прокси: заблокированные запросы сразу получают отказ в соединении
+BLACKHOLE_PROXY = "PROXY 127.0.0.1:9"
+
+# Облегчённый профиль: без телеметрии, обновлений, расширений и фоновых
+# сетевых запросов браузера, которые конкурируют со страницами магазина
+LEAN_PREFS = {
+    "toolkit.telemetry.enabled": False,
+    "toolkit.telemetry.unified": False,
+    "toolkit.telemetry.archive.enabled": False,
+    "datareporting.healthreport.uploadEnabled": False,
+    "datareporting.policy.dataSubmissionEnabled": False,
+    "browser.ping-centre.telemetry": False,
+    "app.normandy.enabled": False,
+    "app.shield.optoutstudies.enabled": False,
+    "app.update.auto": False,
+    "app.update.enabled": False,
+    "app.update.checkInstallTime": False,
+    "extensions.update.enabled": False,
+    "extensions.systemAddon.update.enabled": False,
+    "extensions.getAddons.cache.enabled": False,
+    "extensions.pocket.enabled": False,
+    "extensions.screenshots.disabled": True,
+    "extensions.enabledScopes": 5,
+    "browser.safebrowsing.malware.enabled": False,
+    "browser.safebrowsing.phishing.enabled": False,
+    "browser.safebrowsing.downloads.enabled": False,
+    "browser.shell.checkDefaultBrowser": False,
+    "browser.startup.homepage_override.mstone": "ignore",
+    "browser.newtabpage.enabled": False,
+    "browser.discovery.enabled": False,
+    "network.captive-portal-service.enabled": False,
+    "network.connectivity-service.enabled": False,
+    "network.prefetch-next": False,
+    "network.dns.disablePrefetch": True,
+    "media.autoplay.default": 5,
+    "browser.cache.disk.enable": True,
+    "browser.cache.disk.smart_size.enabled": False,
+    "browser.cache.disk.capacity": 512000,
+}
+
+SET_PREFS_SCRIPT = """
+var prefs = arguments[0];
+Object.keys(prefs).forEach(function (name) {
+    var value = prefs[name];
+    if (typeof value === 'boolean') { Services.prefs.setBoolPref(name, value); }
+    else if (typeof value === 'number') { Services.prefs.setIntPref(name, value); }
+    else { Services.prefs.setStringPref(name, value); }
+});
+"""
+
+_slots = set()
+_slots_lock = threading.Lock()
+
+
+def parse_categories(value):
+    categories = tuple(category.strip() for category in (value or "").split(",") if category.strip())
+    unknown = set(categories) - set(CATEGORIES)
+    if unknown:
+        raise ValueError(f"Unknown resource categories: {', '.join(sorted(unknown))}")
+    return categories
+
+
+def pac_url(hosts):
+    conditions = " || ".join(f'host == "{host}" || dnsDomainIs(host, ".{host}")' for host in hosts)
+    script = f'function FindProxyForURL(url, host) {{ return ({conditions}) ? "{BLACKHOLE_PROXY}" : "DIRECT"; }}'
+    return "data:text/plain," + quote(script)
+
+
+def blocking_prefs(categories=(), hosts=()):
+    hosts = tuple(hosts) + (ANALYTICS_HOSTS if ANALYTICS in categories else ())
+    prefs = {
+        "permissions.default.image": 2 if IMAGES in categories else 1,
+        "gfx.downloadable_fonts.enabled": FONTS not in categories,
+        "network.proxy.type": 2 if hosts else 0,
+    }
+    if hosts:
+        prefs["network.proxy.autoconfig_url"] = pac_url(hosts)
+    return prefs
+
+
+def acquire_slot():
+    # Номер слота задаёт каталог дискового кэша: кэш переживает пересоздание
+    # браузера и следующий прогон, но два живых браузера его не делят
+    with _slots_lock:
+        slot = 0
+        while slot in _slots:
+            slot += 1
+        _slots.add(slot)
+        return slot
+
+
+def release_slot(slot):
+    with _slots_lock:
+        _slots.discard(slot)
+
+
+def firefox_options(headless=False, cache_dir=None, slot=0):
+    options = webdriver.FirefoxOptions()
+    options.add_argument("--width=1920")
+    options.add_argument("--height=1080")
+    # Без него Firefox 138+ не даёт менять настройки из chrome-контекста
+    options.add_argument("-remote-allow-system-access")
+    if headless:
+        options.add_argument("-headless")
+    for name, value in LEAN_PREFS.items():
+        options.set_preference(name, value)
+    for name, value in blocking_prefs().items():
+        options.set_preference(name, value)
+    if cache_dir:
+        directory = os.path.abspath(os.path.join(cache_dir, f"slot{slot}"))
+        os.makedirs(directory, exist_ok=True)
+        options.set_preference("browser.cache.disk.parent_directory", directory)
+    return options
+
+
+def apply_blocking(driver, categories=(), hosts=()):
+    # Настройки меняются только при смене набора блокировок
+    state = (frozenset(categories), frozenset(hosts))
+    if getattr(driver, "resource_blocking", None) == state:
+        return
+    with driver.context(driver.CONTEXT_CHROME):
+        driver.execute_script(SET_PREFS_SCRIPT, blocking_prefs(categories, hosts))
+    driver.resource_blocking = state
+    logger.info(f"Blocking resources: {sorted(categories) or 'none'}, extra hosts: {sorted(hosts) or 'none'}")
@@ -0,0 +1,419 @@
+import functools
+import glob
+import json
+import os
+import pytest
+from selenium import webdriver
+import logging
+import allure
+import allure_commons
+from allure_commons.types import AttachmentType
+
+import benchmark
+import browser_profile
+import http_cache
+import interaction
+import locators
+import resilience
+import scheduler
+import screenshots
+import timing
+import urls
+import waits
+
+from allure_sink import IMAGE_FORMATS, install_attachment_sink
+from api_session import ShopApi, generate_random_email
+from driver_pool import DriverPool
+from local_opencart import LocalOpenCart
+from parallel import is_worker, merge_worker_results, worker_id, worker_results_dir
+from session_cache import DEFAULT_TTL, SnapshotCache, restore_scenario
+
+logger = logging.getLogger(__name__)
+
+TEST_TIMINGS = {}
+TIMING_SUMMARY = pytest.StashKey()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("browser")
+    group.addoption("--pool-size", type=int, default=1,
+                    help="Количество тёплых экземпляров Firefox в пуле")
+    group.addoption("--driver-max-uses", type=int, default=25,
+                    help="Через сколько тестов браузер из пула пересоздаётся")
+    group.addoption("--snapshot-dir", default=".session_cache",
+                    help="Каталог кэша снимков авторизованных сессий")
+    group.addoption("--snapshot-ttl", type=int, default=DEFAULT_TTL,
+                    help="Время жизни снимка сессии в секундах")
+    group.addoption("--headless", action="store_true", default=False,
+                    help="Запускать Firefox без окна")
+    group.addoption("--browser-cache-dir", default=".browser_cache",
+                    help="Каталог дискового кэша Firefox, сохраняется между прогонами; пусто — кэш в профиле")
+    group.addoption("--block-resources", default="analytics,images",
+                    help="Что блокировать по умолчанию: analytics, images, fonts через запятую; пусто — ничего. "
+                         "Маркеры full_render и block_resources меняют набор для отдельного теста")
+    group.addoption("--interaction", choices=interaction.MODES, default=interaction.FAST,
+                    help="fast — без анимаций, меню по ссылкам, превью одной проверкой; "
+                         "interactive — наведение, клики и попапы как у пользователя. Маркер interactive включает его для теста")
+    group.addoption("--wait-history", default=".wait_history.json",
+                    help="Файл с историей ожиданий, по которой подбираются таймауты локаторов; пусто — не сохранять")
+
+    group = parser.getgroup("shop")
+    group.addoption("--base-url", default=urls.DEFAULT_BASE_URL,
+                    help="Адрес тестируемого магазина (по умолчанию OPENCART_BASE_URL или демо-магазин)")
+    group.addoption("--local-shop", action="store_true", default=False,
+                    help="Запустить локальную заглушку OpenCart и гонять тесты против неё")
+    group.addoption("--http-cache", choices=http_cache.MODES, default=http_cache.OFF,
+                    help="Кэширующий прокси: record сохраняет статику и страницы каталога, replay отдаёт их с диска")
+    group.addoption("--http-cache-dir", default=".http_cache",
+                    help="Каталог с записанными ответами магазина")
+    group.addoption("--http-cache-stubs", default=None,
+                    help="JSON-файл с заглушками POST-маршрутов: {route: {status, content_type, body}}")
+    group.addoption("--cart-cases", default=os.path.join(os.path.dirname(__file__), "cart_cases.json"),
+                    help="JSON-файл с кейсами корзины: [{id, product, quantity, expected: {товар: количество}, total?}]")
+
+    group = parser.getgroup("screenshots")
+    group.addoption("--screenshots", choices=screenshots.MODES, default=screenshots.ALWAYS,
+                    help="Политика скриншотов: always, on_failure или ring (последние N шагов при падении)")
+    group.addoption("--screenshot-ring-size", type=int, default=5,
+                    help="Сколько последних скриншотов хранить в режиме ring")
+
+    group = parser.getgroup("attachments")
+    group.addoption("--attachment-format", choices=sorted(IMAGE_FORMATS), default=None,
+                    help="Пережимать PNG-вложения в указанный формат (нужен Pillow)")
+    group.addoption("--attachment-max-width", type=int, default=None,
+                    help="Уменьшать скриншоты до указанной ширины (нужен Pillow)")
+    group.addoption("--attachment-budget-mb", type=float, default=200,
+                    help="Лимит места на вложения за прогон, 0 — без ограничения")
+
+    group = parser.getgroup("benchmark")
+    group.addoption("--benchmark", action="store_true", default=False,
+                    help="Запустить бенчмарки пользовательских сценариев (иначе они пропускаются)")
+    group.addoption("--benchmark-rounds", type=int, default=5,
+                    help="Сколько раз прогонять каждый сценарий")
+    group.addoption("--benchmark-baseline", default=None,
+                    help="Файл с базовыми замерами (по умолчанию .benchmarks/<хост магазина или local>.json)")
+    group.addoption("--benchmark-save", action="store_true", default=False,
+                    help="Сохранить текущие замеры как базовые")
+    group.addoption("--benchmark-threshold", type=float, default=0.2,
+                    help="Допустимый относительный рост p50/p95/max, например 0.2 = 20%%")
+    group.addoption("--benchmark-min-delta", type=float, default=0.05,
+                    help="Рост меньше этого числа секунд не считается регрессией")
+
+    group = parser.getgroup("scheduler")
+    group.addoption("--history-file", default=".test_history.json",
+                    help="История прогонов для порядка и выборки тестов; пусто — планировщик выключен")
+    group.addoption("--history-runs", type=int, default=10,
+                    help="Сколько последних результатов каждого теста учитывать")
+    group.addoption("--full-run", action="store_true", default=False,
+                    help="Запустить все тесты, даже не изменившиеся с последнего зелёного прогона")
+
+    group = parser.getgroup("resilience")
+    group.addoption("--step-retries", type=int, default=2,
+                    help="Сколько раз повторять идемпотентный шаг после сетевой ошибки, таймаута или устаревшего элемента")
+    group.addoption("--retry-backoff", type=float, default=0.5,
+                    help="Пауза перед первым повтором в секундах, дальше удваивается (не больше 4 с)")
+    group.addoption("--quarantine", choices=resilience.QUARANTINE_MODES, default=resilience.EXCLUDE,
+                    help="Тесты из карантина: exclude — пропустить, only — запустить только их, include — вместе со всеми")
+    group.addoption("--quarantine-file", default=".quarantine.json",
+                    help="Файл карантина нестабильных тестов")
+    group.addoption("--quarantine-after", type=int, default=3,
+                    help="В карантин попадает тест, которому повторы понадобились в стольких из последних 5 прогонов")
+
+    group = parser.getgroup("timings")
+    group.addoption("--timing-report", default=None,
+                    help="Записать JSON со временем шагов, ожиданий и команд WebDriver")
+    group.addoption("--slowest-steps", type=int, default=10,
+                    help="Сколько самых медленных шагов показать в итогах прогона, 0 — не показывать")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: бенчмарк сценария, запускается только с --benchmark")
+    config.addinivalue_line("markers", "full_render: тесту нужны все ресурсы страницы, ничего не блокируется")
+    config.addinivalue_line("markers", "interactive: тест проходит меню и попапы как пользователь, с анимациями")
+    config.addinivalue_line("markers", "block_resources(*categories, hosts=()): "
+                                       "свой набор блокируемых ресурсов и дополнительных хостов")
+
+    # Каждый воркер xdist пишет результаты Allure в свой каталог,
+    # контроллер сливает их в общий allure_results по окончании прогона.
+    report_dir = getattr(config.option, "allure_report_dir", None)
+    if report_dir and is_worker(config):
+        config.option.allure_report_dir = worker_results_dir(report_dir, worker_id(config))
+        config.option.clean_alluredir = False
+
+    # История забирается из allure_results до того, как allure очистит каталог
+    history_path = config.getoption("--history-file")
+    if history_path:
+        plugin = scheduler.Scheduler(config, history_path, runs=config.getoption("--history-runs"),
+                                     full_run=config.getoption("--full-run"))
+        if report_dir and not is_worker(config):
+            plugin.ingest(report_dir)
+        config.pluginmanager.register(plugin, "scheduler")
+
+    config.pluginmanager.register(resilience.Quarantine(
+        config,
+        config.getoption("--quarantine-file"),
+        mode=config.getoption("--quarantine"),
+        quarantine_after=config.getoption("--quarantine-after"),
+    ), "quarantine")
+
+
+def pytest_sessionstart(session):
+    config = session.config
+    if config.getoption("--local-shop"):
+        shop = LocalOpenCart().start()
+        config.add_cleanup(shop.stop)
+        urls.configure(shop.base_url, shop="local")
+    else:
+        urls.configure(config.getoption("--base-url"))
+
+    if config.getoption("--http-cache") != http_cache.OFF:
+        proxy = http_cache.CachingProxy(
+            urls.base_url,
+            config.getoption("--http-cache-dir"),
+            mode=config.getoption("--http-cache"),
+            stubs=http_cache.load_stubs(config.getoption("--http-cache-stubs")),
+        ).start()
+        config.add_cleanup(proxy.stop)
+        urls.configure(proxy.base_url, shop=urls.shop_id)
+
+    screenshots.configure(config.getoption("--screenshots"), config.getoption("--screenshot-ring-size"))
+    resilience.configure(config.getoption("--step-retries"), config.getoption("--retry-backoff"))
+    interaction.configure(config.getoption("--interaction"))
+
+    # Лимит места делится поровну между воркерами xdist
+    budget_bytes = int(config.getoption("--attachment-budget-mb") * 1024 * 1024)
+    if is_worker(config):
+        budget_bytes //= config.workerinput.get("workercount", 1)
+    install_attachment_sink(
+        config,
+        image_format=config.getoption("--attachment-format"),
+        max_width=config.getoption("--attachment-max-width"),
+        budget_bytes=budget_bytes,
+    )
+
+    waits.engine.load(config.getoption("--wait-history"))
+
+    allure_commons.plugin_manager.register(timing.timer)
+    config.add_cleanup(lambda: allure_commons.plugin_manager.unregister(timing.timer))
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="бенчмарки запускаются с --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+def pytest_generate_tests(metafunc):
+    if "cart_case" in metafunc.fixturenames:
+        with open(metafunc.config.getoption("--cart-cases"), encoding="utf-8") as f:
+            cases = json.load(f)
+        metafunc.parametrize("cart_case", cases, ids=[case["id"] for case in cases])
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_setup(item):
+    timing.timer.begin_test(item.nodeid)
+    resilience.tracker.begin_test()
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    report = (yield).get_result()
+    if report.when == "call" or (report.when == "setup" and report.failed):
+        screenshots.policy.test_finished(report.failed, item.funcargs.get("browser"))
+        timings = timing.timer.end_test()
+        if timings is not None:
+            TEST_TIMINGS[item.nodeid] = timings
+            allure.attach(json.dumps(timings, ensure_ascii=False, indent=2), name="step_timings",
+                          attachment_type=AttachmentType.JSON)
+        retries = resilience.tracker.records
+        if retries:
+            allure.attach(json.dumps(retries, ensure_ascii=False, indent=2), name="step_retries",
+                          attachment_type=AttachmentType.JSON)
+        report.user_properties.append(("step_retries", len(retries)))
+
+
+def pytest_sessionfinish(session):
+    for line in locators.registry.summary():
+        logger.info(f"Fastest locator: {line}")
+
+    wait_history = session.config.getoption("--wait-history")
+    if wait_history:
+        waits.engine.save(wait_history)
+
+    report_dir = getattr(session.config.option, "allure_report_dir", None)
+    if report_dir and not is_worker(session.config):
+        merge_worker_results(report_dir)
+
+    # Воркеры пишут свои сводки рядом с итоговым файлом, контроллер их объединяет
+    report_path = session.config.getoption("--timing-report")
+    summary = timing.timer.summary(TEST_TIMINGS)
+    if is_worker(session.config):
+        if report_path:
+            timing.write_summary(f"{report_path}.{worker_id(session.config)}", summary)
+        return
+    worker_paths = glob.glob(f"{report_path}.gw*") if report_path else []
+    if worker_paths:
+        summary = timing.merge_summaries(report_path, worker_paths)
+    elif report_path:
+        timing.write_summary(report_path, summary)
+    session.config.stash[TIMING_SUMMARY] = summary
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    count = config.getoption("--slowest-steps")
+    summary = config.stash.get(TIMING_SUMMARY, None)
+    if not count or not summary or not summary["steps"]:
+        return
+    terminalreporter.section(f"slowest {count} steps")
+    for step in timing.slowest(summary["steps"], count):
+        terminalreporter.write_line(
+            f"{step['duration']:8.2f}s  wait {step['wait_time']:6.2f}s  action {step['action_time']:6.2f}s  "
+            f"{step['command_count']:4d} cmd  {step['test']} :: {step['step']}"
+        )
+
+
+def create_firefox(headless=False, cache_dir=None):
+    slot = browser_profile.acquire_slot()
+    options = browser_profile.firefox_options(headless, cache_dir, slot)
+    # Неявных ожиданий нет: все ожидания явные, через waits.engine
+    try:
+        driver = webdriver.Firefox(options=options)
+    except Exception:
+        browser_profile.release_slot(slot)
+        raise
+    driver.resource_blocking = (frozenset(), frozenset())
+    quit = driver.quit
+
+    def quit_and_release():
+        try:
+            quit()
+        finally:
+            browser_profile.release_slot(slot)
+
+    driver.quit = quit_and_release
+    timing.instrument(driver)
+    logger.info("Browser initialized")
+    return driver
+
+
+@pytest.fixture(scope="session")
+def driver_pool(request):
+    config = request.config
+    cache_dir = config.getoption("--browser-cache-dir")
+    pool = DriverPool(
+        functools.partial(
+            create_firefox,
+            headless=config.getoption("--headless"),
+            cache_dir=os.path.join(cache_dir, worker_id(config)) if cache_dir else None,
+        ),
+        size=request.config.getoption("--pool-size"),
+        max_uses=request.config.getoption("--driver-max-uses"),
+    )
+    pool.warm_up()
+    yield pool
+    pool.close()
+
+
+def resource_blocking(item):
+    if item.get_closest_marker("full_render"):
+        return (), ()
+    marker = item.get_closest_marker("block_resources")
+    if marker is not None:
+        return browser_profile.parse_categories(",".join(marker.args)), tuple(marker.kwargs.get("hosts", ()))
+    return browser_profile.parse_categories(item.config.getoption("--block-resources")), ()
+
+
+@pytest.fixture
+def browser(request, driver_pool):
+    with allure.step("Инициализация браузера"):
+        driver = driver_pool.acquire()
+        browser_profile.apply_blocking(driver, *resource_blocking(request.node))
+        interaction.use(interaction.INTERACTIVE if request.node.get_closest_marker("interactive") else None)
+        yield driver
+        with allure.step("Сброс состояния браузера"):
+            driver_pool.release(driver)
+            logger.info("Browser returned to pool")
+
+
+@pytest.fixture
+def user_account():
+    return {
+        "firstname": "Иван",
+        "lastname": "Петров",
+        "email": generate_random_email(),
+        "telephone": "+79123456789",
+        "password": "TestPassword123",
+    }
+
+
+@pytest.fixture
+def authenticated_browser(browser, user_account):
+    with allure.step(f"Создание аккаунта {user_account['email']} через HTTP"):
+        ShopApi().register(**user_account)
+    # Вход в отдельной сессии проверяет, что аккаунт действительно создан
+    # и принимает пароль, а не полагается на авторизацию после регистрации
+    with allure.step(f"Вход под {user_account['email']} через HTTP"):
+        api = ShopApi()
+        api.login(user_account["email"], user_account["password"])
+        api.inject_session(browser)
+    return browser
+
+
+@pytest.fixture(scope="session")
+def product_urls():
+    # Адреса товаров находятся поиском один раз за сессию, дальше тесты
+    # открывают страницу товара напрямую, минуя главную и выдачу поиска
+    api = ShopApi()
+    resolved = {}
+
+    def resolve(product_name):
+        if product_name not in resolved:
+            with allure.step(f"Поиск адреса товара {product_name}"):
+                resolved[product_name] = urls.route_url("product/product",
+                                                        product_id=api.find_product_id(product_name))
+        return resolved[product_name]
+    return resolve
+
+
+@pytest.fixture(scope="session")
+def snapshot_cache(request):
+    return SnapshotCache(
+        request.config.getoption("--snapshot-dir"),
+        ttl=request.config.getoption("--snapshot-ttl"),
+    )
+
+
+@pytest.fixture
+def session_snapshot(browser, snapshot_cache):
+    def restore(scenario):
+        with allure.step(f"Восстановление снимка сессии '{scenario}'"):
+            restore_scenario(browser, snapshot_cache, scenario)
+            return browser
+    return restore
+
+
+@pytest.fixture(scope="session")
+def benchmark_settings(request):
+    config = request.config
+    baseline_path = config.getoption("--benchmark-baseline") or \
+        f".benchmarks/{urls.shop_id.replace(':', '_')}.json"
+    return {
+        "rounds": config.getoption("--benchmark-rounds"),
+        "threshold": config.getoption("--benchmark-threshold"),
+        "min_delta": config.getoption("--benchmark-min-delta"),
+        "baseline_path": baseline_path,
+        "baseline": benchmark.load_baseline(baseline_path),
+    }
+
+
+@pytest.fixture(scope="session")
+def benchmark_recorder(request, benchmark_settings):
+    recorder = benchmark.BenchmarkRecorder()
+    yield recorder
+    if request.config.getoption("--benchmark-save") and recorder.journeys:
+        benchmark.save_baseline(benchmark_settings["baseline_path"], recorder.all_results())
@@ -0,0 +1,104 @@
+import logging
+import queue
+import threading
+
+from selenium.common.exceptions import WebDriverException
+
+logger = logging.getLogger(__name__)
+
+# Сброс состояния между тестами: хранилища текущего источника очищаются
+# одним скриптом, cookies — через WebDriver.
+CLEAR_STORAGE_SCRIPT = """
+try { window.localStorage.clear(); } catch (e) {}
+try { window.sessionStorage.clear(); } catch (e) {}
+"""
+
+
+class DriverPool:
+    def __init__(self, factory, size=1, max_uses=25, acquire_timeout=300):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.LifoQueue()
+        self._uses = {}
+        self._lock = threading.Lock()
+
+    def warm_up(self):
+        while len(self._uses) < self.size:
+            self._idle.put(self._create())
+        logger.info(f"Driver pool warmed up with {self.size} browser(s)")
+
+    def acquire(self):
+        try:
+            driver = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = len(self._uses) < self.size
+            driver = self._create() if can_create else self._idle.get(timeout=self.acquire_timeout)
+
+        if not self.is_healthy(driver):
+            logger.warning("Pooled browser failed health check, recycling it")
+            self._discard(driver)
+            driver = self._create()
+
+        self._uses[driver] += 1
+        return driver
+
+    def release(self, driver):
+        if driver not in self._uses:
+            return
+        if self._uses[driver] >= self.max_uses:
+            logger.info(f"Browser reached {self.max_uses} uses, recycling it")
+            self._discard(driver)
+            return
+        try:
+            self.reset(driver)
+        except WebDriverException as e:
+            logger.warning(f"Could not reset pooled browser, recycling it: {str(e)}")
+            self._discard(driver)
+            return
+        self._idle.put(driver)
+
+    def reset(self, driver):
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        if driver.current_url.startswith("http"):
+            driver.execute_script(CLEAR_STORAGE_SCRIPT)
+            driver.delete_all_cookies()
+        driver.get("about:blank")
+
+    def is_healthy(self, driver):
+        try:
+            driver.window_handles
+            return True
+        except WebDriverException:
+            return False
+
+    def close(self):
+        with self._lock:
+            drivers = list(self._uses)
+            self._uses.clear()
+        for driver in drivers:
+            self._quit(driver)
+        logger.info("Driver pool closed")
+
+    def _create(self):
+        driver = self.factory()
+        with self._lock:
+            self._uses[driver] = 0
+        return driver
+
+    def _discard(self, driver):
+        with self._lock:
+            self._uses.pop(driver, None)
+        self._quit(driver)
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except WebDriverException as e:
+            logger.warning(f"Error while closing browser: {str(e)}")
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import requests
+
+from jsonfile import read_json, write_atomic, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+MODES = (OFF, RECORD, REPLAY)
+
+STATIC_EXTENSIONS = (".css", ".js", ".png", ".jpg", ".jpeg", ".gif", ".svg", ".ico", ".webp",
+                     ".woff", ".woff2", ".ttf", ".eot")
+# Страницы каталога, которые не зависят от действий пользователя
+CACHEABLE_ROUTES = ("common/home", "product/product", "product/search", "product/category")
+TEXT_TYPES = ("text/", "application/javascript", "application/json", "application/x-javascript")
+HOP_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-encoding", "content-length",
+               "proxy-authenticate", "proxy-authorization", "te", "trailers", "upgrade", "set-cookie"}
+
+
+def normalize(path):
+    parts = urlsplit(path)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{parts.path}?{query}" if query else parts.path
+
+
+def route_of(path):
+    parts = urlsplit(path)
+    if parts.path not in ("/", "/index.php"):
+        return None
+    return dict(parse_qsl(parts.query)).get("route", "common/home")
+
+
+def is_cacheable(path):
+    if urlsplit(path).path.lower().endswith(STATIC_EXTENSIONS):
+        return True
+    return route_of(path) in CACHEABLE_ROUTES
+
+
+class ResponseStore:
+    # Ответы лежат на диске: метаданные по ключу запроса, тела — по хешу содержимого
+    def __init__(self, directory):
+        self.directory = directory
+        self.blobs = os.path.join(directory, "blobs")
+        os.makedirs(self.blobs, exist_ok=True)
+
+    def _meta_path(self, path):
+        return os.path.join(self.directory, hashlib.sha1(normalize(path).encode("utf-8")).hexdigest() + ".json")
+
+    def load(self, path):
+        meta = read_json(self._meta_path(path))
+        if meta is None:
+            return None
+        try:
+            with open(os.path.join(self.blobs, meta["body"]), "rb") as f:
+                body = f.read()
+        except (OSError, KeyError):
+            return None
+        return meta["status"], meta["headers"], body
+
+    def save(self, path, status, headers, body):
+        digest = hashlib.sha256(body).hexdigest()
+        blob = os.path.join(self.blobs, digest)
+        if not os.path.exists(blob):
+            write_atomic(blob, body)
+        meta = {"path": normalize(path), "status": status, "headers": headers, "body": digest}
+        write_json_atomic(self._meta_path(path), meta)
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    server_version = "OpenCartCache/1.0"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        self._handle(None)
+
+    def do_HEAD(self):
+        self._handle(None)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self._handle(self.rfile.read(length))
+
+    def _handle(self, body):
+        proxy = self.server.proxy
+        if self.command == "GET" and proxy.mode != OFF and is_cacheable(self.path):
+            if proxy.mode == REPLAY:
+                cached = proxy.store.load(self.path)
+                if cached is not None:
+                    proxy.count("hits")
+                    return self._reply(*cached)
+                proxy.count("misses")
+            status, headers, content, cookies = proxy.forward(self)
+            if status == 200:
+                proxy.store.save(self.path, status, headers, content)
+            return self._reply(status, headers, content, cookies)
+
+        stub = proxy.stubs.get(route_of(self.path)) if self.command == "POST" else None
+        if stub is not None:
+            proxy.count("stubbed")
+            return self._reply(stub.get("status", 200), {"Content-Type": stub.get("content_type", "application/json")},
+                               stub.get("body", "").encode("utf-8"))
+
+        proxy.count("passed")
+        self._reply(*proxy.forward(self, body))
+
+    def _reply(self, status, headers, content, cookies=()):
+        proxy = self.server.proxy
+        content_type = headers.get("Content-Type", "")
+        if content_type.startswith(TEXT_TYPES):
+            content = proxy.rewrite(content)
+        self.send_response(status)
+        for name, value in headers.items():
+            if name.lower() == "location":
+                value = proxy.rewrite(value.encode("utf-8")).decode("utf-8")
+            self.send_header(name, value)
+        for cookie in cookies:
+            self.send_header("Set-Cookie", cookie)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(content)
+
+
+class CachingProxy:
+    # Обратный прокси перед магазином: в режиме record сохраняет ответы на
+    # GET-запросы статики и страниц каталога, в режиме replay отдаёт их с диска.
+    # POST-запросы и страницы, зависящие от сессии, всегда идут в магазин,
+    # если для маршрута не задана явная заглушка.
+    def __init__(self, upstream, directory, mode=REPLAY, stubs=None, host="127.0.0.1", port=0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown HTTP cache mode: {mode}")
+        self.upstream = upstream if upstream.endswith("/") else f"{upstream}/"
+        self.store = ResponseStore(directory)
+        self.mode = mode
+        self.stubs = stubs or {}
+        self.stats = {"hits": 0, "misses": 0, "passed": 0, "stubbed": 0}
+        self.session = requests.Session()
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), ProxyHandler)
+        self.server.daemon_threads = True
+        self.server.proxy = self
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def forward(self, handler, body=None):
+        headers = {name: value for name, value in handler.headers.items()
+                   if name.lower() not in HOP_HEADERS and name.lower() not in ("host", "accept-encoding")}
+        for name in ("Origin", "Referer"):
+            if name in headers:
+                headers[name] = headers[name].replace(self.base_url, self.upstream)
+        response = self.session.request(handler.command, self.upstream + handler.path.lstrip("/"),
+                                        headers=headers, data=body, allow_redirects=False, timeout=60)
+        kept = {name: value for name, value in response.headers.items() if name.lower() not in HOP_HEADERS}
+        cookies = [self._local_cookie(cookie) for cookie in response.raw.headers.getlist("Set-Cookie")]
+        return response.status_code, kept, response.content, cookies
+
+    def rewrite(self, content):
+        # Абсолютные ссылки магазина должны вести обратно через прокси
+        upstream, local = self.upstream, self.base_url
+        for source, target in ((upstream, local),
+                               (upstream.replace("/", "\\/"), local.replace("/", "\\/")),
+                               ("//" + urlsplit(upstream).netloc + "/", "//" + urlsplit(local).netloc + "/")):
+            content = content.replace(source.encode("utf-8"), target.encode("utf-8"))
+        return content
+
+    def _local_cookie(self, cookie):
+        return re.sub(r";\s*(Domain=[^;]*|Secure|SameSite=[^;]*)", "", cookie, flags=re.I)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="http-cache-proxy", daemon=True)
+        self._thread.start()
+        logger.info(f"HTTP cache proxy ({self.mode}) for {self.upstream} listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+        logger.info(f"HTTP cache proxy stats: {self.stats}")
+
+
+def load_stubs(path):
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,54 @@
+FAST = "fast"
+INTERACTIVE = "interactive"
+MODES = (FAST, INTERACTIVE)
+
+# Анимации отключаются на уровне страницы: CSS-переходы и keyframes
+# стилем с !important, анимации jQuery через $.fx.off
+NO_ANIMATION_SCRIPT = """
+if (!document.getElementById('no-animations')) {
+    var style = document.createElement('style');
+    style.id = 'no-animations';
+    style.textContent = '*, *::before, *::after { transition: none !important; '
+        + 'animation: none !important; scroll-behavior: auto !important; }';
+    (document.head || document.documentElement).appendChild(style);
+}
+if (window.jQuery) { window.jQuery.fx.off = true; }
+"""
+
+# Проверка целей всех превью одним асинхронным вызовом: каждая ссылка
+# загружается как картинка, результат — [{url, loaded}] в порядке превью
+IMAGES_LOADED_SCRIPT = """
+var done = arguments[arguments.length - 1];
+var links = Array.prototype.slice.call(document.querySelectorAll(arguments[0]));
+var pending = links.length, results = [];
+if (!pending) { done(results); return; }
+links.forEach(function (link, i) {
+    var img = new Image();
+    function finish(loaded) {
+        results[i] = {url: link.href, loaded: loaded};
+        if (--pending === 0) { done(results); }
+    }
+    img.onload = function () { finish(img.naturalWidth > 0); };
+    img.onerror = function () { finish(false); };
+    img.src = link.href;
+});
+"""
+
+default = FAST
+mode = FAST
+
+
+def configure(interaction_mode):
+    global default, mode
+    if interaction_mode not in MODES:
+        raise ValueError(f"Unknown interaction mode: {interaction_mode}")
+    default = mode = interaction_mode
+
+
+def use(interaction_mode=None):
+    global mode
+    mode = interaction_mode or default
+
+
+def is_fast():
+    return mode == FAST
@@ -0,0 +1,33 @@
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+def read_json(path, default=None):
+    # Отсутствующий или повреждённый файл состояния не ломает прогон:
+    # вызывающий код получает default и начинает с чистого листа
+    if not path or not os.path.exists(path):
+        return default
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read {path}: {e}")
+        return default
+
+
+def write_atomic(path, data):
+    # Запись через временный файл и os.replace: параллельные воркеры и
+    # потоки прокси никогда не видят наполовину записанный файл
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_json_atomic(path, data, indent=None, sort_keys=False):
+    write_atomic(path, json.dumps(data, ensure_ascii=False, indent=indent, sort_keys=sort_keys).encode("utf-8"))
@@ -0,0 +1,602 @@
+import argparse
+import html
+import json
+import logging
+import struct
+import threading
+import uuid
+import zlib
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIE = "OCSESSID"
+
+# Каталог повторяет товары демо-магазина, которых касаются тесты
+PRODUCTS = [
+    {"id": 43, "name": "MacBook", "model": "Product 16", "price": 602.00, "images": 4, "color": (160, 160, 170)},
+    {"id": 40, "name": "iPhone", "model": "product 11", "price": 123.20, "images": 6, "color": (40, 40, 40)},
+    {"id": 31, "name": "Nikon D300", "model": "Product 4", "price": 98.00, "images": 3, "color": (20, 20, 20)},
+    {"id": 49, "name": "Samsung Galaxy Tab 10.1", "model": "SAM1", "price": 241.99, "images": 7, "color": (30, 30, 60)},
+    {"id": 28, "name": "HTC Touch HD", "model": "Product 1", "price": 122.00, "images": 2, "color": (90, 90, 90)},
+    {"id": 42, "name": "Apple Cinema 30\"", "model": "Product 15", "price": 122.00, "images": 5, "color": (200, 200, 210)},
+]
+FEATURED = (43, 40, 42, 31)
+CATEGORIES = {"20": "Компьютеры", "20_26": "PC", "20_27": "Mac"}
+
+STYLE = """
+body { font-family: sans-serif; margin: 0; }
+#top, header, #menu, #container { padding: 8px 16px; }
+.dropdown { position: relative; display: inline-block; }
+.dropdown-menu { display: none; position: absolute; background: #fff; border: 1px solid #ccc; z-index: 10; min-width: 160px; }
+.dropdown.open .dropdown-menu, #menu .dropdown:hover .dropdown-menu { display: block; }
+.dropdown-menu a { display: block; padding: 4px 8px; }
+.product-thumb { display: inline-block; width: 200px; margin: 8px; vertical-align: top; }
+ul.thumbnails { list-style: none; padding: 0; }
+ul.thumbnails li { display: inline-block; margin: 4px; }
+a.thumbnail img { width: 74px; height: 74px; }
+.tab-pane { display: none; }
+.tab-pane.active { display: block; }
+.alert-success { background: #dff0d8; padding: 8px; }
+.text-danger { color: #a94442; }
+.mfp-wrap { position: fixed; top: 0; left: 0; width: 100%; height: 100%; background: rgba(0, 0, 0, .8); z-index: 1000; }
+.mfp-content { margin: 40px auto; width: 500px; background: #fff; }
+.mfp-image { display: block; position: relative; }
+.mfp-img { width: 500px; height: 500px; display: block; }
+.mfp-close { position: absolute; top: 0; right: 0; }
+"""
+
+SCRIPT = """
+function route(name, params) {
+    return 'index.php?route=' + name + (params ? '&' + params : '');
+}
+function showAlert(message) {
+    var old = document.querySelector('.alert-success');
+    if (old) { old.remove(); }
+    var alert = document.createElement('div');
+    alert.className = 'alert alert-success alert-dismissible';
+    alert.innerHTML = message + ' <button type="button" class="close">&times;</button>';
+    var content = document.getElementById('content');
+    content.parentNode.insertBefore(alert, content);
+}
+function post(name, data, callback) {
+    var body = Object.keys(data).map(function (key) {
+        return encodeURIComponent(key) + '=' + encodeURIComponent(data[key]);
+    }).join('&');
+    fetch(route(name), {method: 'POST', credentials: 'same-origin', body: body,
+        headers: {'Content-Type': 'application/x-www-form-urlencoded'}})
+        .then(function (response) { return response.json(); })
+        .then(callback);
+}
+var wishlist = {
+    add: function (productId) {
+        post('account/wishlist/add', {product_id: productId}, function (json) { showAlert(json.success); });
+    }
+};
+document.addEventListener('DOMContentLoaded', function () {
+    document.querySelectorAll('#top-links .dropdown-toggle').forEach(function (toggle) {
+        toggle.addEventListener('click', function (event) {
+            event.preventDefault();
+            toggle.parentNode.classList.toggle('open');
+        });
+    });
+    var search = document.querySelector('#search input[name=search]');
+    function doSearch() {
+        location = route('product/search', 'search=' + encodeURIComponent(search.value));
+    }
+    document.querySelector('#search button').addEventListener('click', doSearch);
+    search.addEventListener('keydown', function (event) { if (event.key === 'Enter') { doSearch(); } });
+
+    document.querySelectorAll('.nav-tabs a').forEach(function (tab) {
+        tab.addEventListener('click', function (event) {
+            event.preventDefault();
+            showTab(tab.getAttribute('href'));
+        });
+    });
+    document.querySelectorAll('ul.thumbnails a.thumbnail').forEach(function (link) {
+        link.addEventListener('click', function (event) {
+            event.preventDefault();
+            openPopup(link.getAttribute('href'));
+        });
+    });
+    var cartButton = document.getElementById('button-cart');
+    if (cartButton) {
+        cartButton.addEventListener('click', function () {
+            post('checkout/cart/add', {
+                product_id: document.querySelector('#product input[name=product_id]').value,
+                quantity: document.querySelector('#product input[name=quantity]').value
+            }, function (json) {
+                showAlert(json.success);
+                document.getElementById('cart-total').textContent = json.total;
+            });
+        });
+    }
+    var reviewButton = document.getElementById('button-review');
+    if (reviewButton) {
+        reviewButton.addEventListener('click', function () {
+            var form = document.getElementById('form-review');
+            var rating = form.querySelector('input[name=rating]:checked');
+            post('product/product/write', {
+                product_id: form.getAttribute('data-product-id'),
+                name: form.querySelector('input[name=name]').value,
+                text: form.querySelector('textarea[name=text]').value,
+                rating: rating ? rating.value : ''
+            }, function (json) {
+                if (json.success) {
+                    showAlert(json.success);
+                } else {
+                    var error = document.createElement('div');
+                    error.className = 'alert alert-danger';
+                    error.textContent = json.error;
+                    form.insertBefore(error, form.firstChild);
+                }
+            });
+        });
+    }
+});
+function showTab(id) {
+    document.querySelectorAll('.tab-pane').forEach(function (pane) { pane.classList.remove('active'); });
+    document.querySelector(id).classList.add('active');
+}
+function openPopup(src) {
+    var wrap = document.createElement('div');
+    wrap.className = 'mfp-wrap';
+    wrap.innerHTML = '<div class="mfp-container mfp-image-holder"><div class="mfp-content">' +
+        '<div class="mfp-figure mfp-image"><button title="Close (Esc)" type="button" class="mfp-close">&times;</button>' +
+        '<img class="mfp-img" src="' + src + '"></div></div></div>';
+    document.body.appendChild(wrap);
+    wrap.querySelector('.mfp-close').addEventListener('click', function () { wrap.remove(); });
+    setTimeout(function () { wrap.classList.add('mfp-ready'); }, 0);
+}
+"""
+
+
+def png(width, height, rgb):
+    raw = b"".join(b"\x00" + bytes(rgb) * width for _ in range(height))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def money(value):
+    return f"{value:.2f}р."
+
+
+def url(route, **params):
+    query = "".join(f"&{key}={quote(str(value))}" for key, value in params.items())
+    return f"index.php?route={route}{query}"
+
+
+def esc(value):
+    return html.escape(str(value))
+
+
+class ShopState:
+    def __init__(self):
+        self.products = {product["id"]: product for product in PRODUCTS}
+        self.accounts = {}
+        self.sessions = {}
+        self.reviews = []
+        self.lock = threading.Lock()
+
+    def session(self, session_id):
+        with self.lock:
+            return self.sessions.setdefault(session_id, {"customer": None, "cart": {}, "wishlist": []})
+
+    def search(self, query):
+        query = query.lower()
+        return [product for product in PRODUCTS if query and query in product["name"].lower()]
+
+
+class ShopHandler(BaseHTTPRequestHandler):
+    server_version = "LocalOpenCart/1.0"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8")
+        self.form = {key: values[0] for key, values in parse_qs(body).items()}
+        self._dispatch("POST")
+
+    def _dispatch(self, method):
+        parts = urlsplit(self.path)
+        self.query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        self.method = method
+        self._load_session()
+
+        if parts.path == "/robots.txt":
+            return self._send(200, "User-agent: *\nDisallow:\n", "text/plain")
+        if parts.path.startswith("/image/"):
+            return self._image(parts.path)
+        if parts.path not in ("/", "/index.php"):
+            return self._send(404, self._page("Страница не найдена", "<h1>Страница не найдена!</h1>"))
+
+        handler = ROUTES.get((method, self.query.get("route", "common/home")))
+        if handler is None:
+            return self._send(404, self._page("Страница не найдена", "<h1>Страница не найдена!</h1>"))
+        handler(self)
+
+    def _load_session(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        self.new_session = SESSION_COOKIE not in cookie
+        self.session_id = uuid.uuid4().hex if self.new_session else cookie[SESSION_COOKIE].value
+        self.session = self.server.state.session(self.session_id)
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=()):
+        data = body if isinstance(body, bytes) else body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        if self.new_session:
+            self.send_header("Set-Cookie", f"{SESSION_COOKIE}={self.session_id}; Path=/")
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, data):
+        self._send(200, json.dumps(data, ensure_ascii=False), "application/json; charset=utf-8")
+
+    def _redirect(self, location):
+        self._send(302, "", headers=[("Location", f"/{location}")])
+
+    def _image(self, path):
+        # /image/<product_id>_<n>.png — однотонная картинка нужного товара
+        try:
+            product_id, index = path.rsplit("/", 1)[1].split(".")[0].split("_")
+            product = self.server.state.products[int(product_id)]
+        except (ValueError, KeyError):
+            return self._send(404, "", "text/plain")
+        shade = tuple(min(255, channel + int(index) * 12) for channel in product["color"])
+        self._send(200, png(64, 64, shade), "image/png", [("Cache-Control", "max-age=3600")])
+
+    def _page(self, title, content):
+        customer = self.session["customer"]
+        account_links = (
+            f'<li><a href="{url("account/account")}">Личный кабинет</a></li>'
+            f'<li><a href="{url("account/logout")}">Выход</a></li>'
+            if customer else
+            f'<li><a href="{url("account/register")}">Регистрация</a></li>'
+            f'<li><a href="{url("account/login")}">Авторизация</a></li>'
+        )
+        items = sum(self.session["cart"].values())
+        return f"""<!DOCTYPE html>
+<html lang="ru"><head><meta charset="UTF-8"><title>{esc(title)}</title>
+<style>{STYLE}</style><script>{SCRIPT}</script></head>
+<body>
+<nav id="top"><div id="top-links"><ul class="list-inline">
+<li class="dropdown"><a href="{url("account/account")}" title="Личный кабинет" class="dropdown-toggle">Личный кабинет</a>
+<ul class="dropdown-menu dropdown-menu-right">{account_links}</ul></li>
+<li><a href="{url("account/wishlist")}" id="wishlist-total" title="Закладки ({len(self.session["wishlist"])})">Закладки</a></li>
+<li><a href="{url("checkout/cart")}" title="Корзина покупок">Корзина покупок</a></li>
+</ul></div></nav>
+<header><div id="logo"><a href="{url("common/home")}">Local OpenCart</a></div>
+<div id="search" class="input-group"><input type="text" name="search" value="{esc(self.query.get("search", ""))}" placeholder="Поиск">
+<span class="input-group-btn"><button type="button" class="btn btn-default">Поиск</button></span></div>
+<div id="cart"><button type="button"><span id="cart-total">Товаров {items} ({money(self._cart_total())})</span></button></div>
+</header>
+<nav id="menu"><ul class="nav navbar-nav">
+<li class="dropdown"><a href="{url("product/category", path="20")}" class="dropdown-toggle">Компьютеры</a>
+<div class="dropdown-menu"><ul class="list-unstyled">
+<li><a href="{url("product/category", path="20_26")}">PC (0)</a></li>
+<li><a href="{url("product/category", path="20_27")}">Mac (1)</a></li>
+</ul></div></li>
+</ul></nav>
+<div id="container" class="container"><div class="row"><div id="content" class="col-sm-12">
+{content}
+</div></div></div>
+</body></html>"""
+
+    def _cart_total(self):
+        products = self.server.state.products
+        return sum(products[product_id]["price"] * quantity for product_id, quantity in self.session["cart"].items())
+
+    def _thumb(self, product):
+        link = url("product/product", product_id=product["id"])
+        return f"""<div class="product-layout"><div class="product-thumb transition">
+<div class="image"><a href="{link}"><img src="/image/{product["id"]}_0.png" alt="{esc(product["name"])}" class="img-responsive"></a></div>
+<div class="caption"><h4><a href="{link}">{esc(product["name"])}</a></h4>
+<p class="price">{money(product["price"])}</p></div>
+<div class="button-group"><button type="button" data-original-title="В закладки" onclick="wishlist.add('{product["id"]}');">В закладки</button></div>
+</div></div>"""
+
+    def home(self):
+        products = "".join(self._thumb(self.server.state.products[product_id]) for product_id in FEATURED)
+        self._send(200, self._page("Local OpenCart", f'<h3>Рекомендуемые</h3><div class="row">{products}</div>'))
+
+    def search(self):
+        query = self.query.get("search", "")
+        found = self.server.state.search(query)
+        results = "".join(self._thumb(product) for product in found) or \
+            "<p>Нет товаров, которые соответствуют критериям поиска.</p>"
+        self._send(200, self._page(f"Поиск - {query}", f'<h1>Поиск - {esc(query)}</h1><div class="row">{results}</div>'))
+
+    def category(self):
+        name = CATEGORIES.get(self.query.get("path", ""))
+        if name is None:
+            return self._send(404, self._page("Категория не найдена", "<h1>Категория не найдена!</h1>"))
+        self._send(200, self._page(name, f"<h2>{esc(name)}</h2><p>В этой категории нет товаров.</p>"))
+
+    def product(self):
+        try:
+            product = self.server.state.products[int(self.query.get("product_id", ""))]
+        except (ValueError, KeyError):
+            return self._send(404, self._page("Товар не найден", "<h1>Товар не найден!</h1>"))
+        thumbnails = "".join(
+            f'<li class="image-additional"><a class="thumbnail" href="/image/{product["id"]}_{index}.png" '
+            f'title="{esc(product["name"])}"><img src="/image/{product["id"]}_{index}.png"></a></li>'
+            for index in range(product["images"])
+        )
+        stars = "".join(f'<input type="radio" name="rating" value="{value}"> ' for value in range(1, 6))
+        reviews = sum(1 for review in self.server.state.reviews if review["product_id"] == product["id"])
+        content = f"""<div class="row"><div class="col-sm-8">
+<ul class="thumbnails">{thumbnails}</ul>
+<ul class="nav nav-tabs"><li class="active"><a href="#tab-description">Описание</a></li>
+<li><a href="#tab-review">Отзывов ({reviews})</a></li></ul>
+<div class="tab-content">
+<div class="tab-pane active" id="tab-description"><p>{esc(product["name"])} — описание товара.</p></div>
+<div class="tab-pane" id="tab-review"><form class="form-horizontal" id="form-review" data-product-id="{product["id"]}">
+<h2>Написать отзыв</h2>
+<div class="form-group required"><label for="input-name">Ваше имя</label>
+<input type="text" name="name" value="" id="input-name" placeholder="Ваше имя" class="form-control"></div>
+<div class="form-group required"><label for="input-review">Ваш отзыв</label>
+<textarea name="text" rows="5" id="input-review" placeholder="Ваш отзыв" class="form-control"></textarea></div>
+<div class="form-group required"><label>Рейтинг</label> Плохо {stars} Хорошо</div>
+<div class="buttons"><button type="button" id="button-review" class="btn btn-primary">Продолжить</button></div>
+</form></div></div></div>
+<div class="col-sm-4">
+<div class="btn-group"><button type="button" class="btn btn-default" data-original-title="В закладки" onclick="wishlist.add('{product["id"]}');">В закладки</button></div>
+<h1>{esc(product["name"])}</h1>
+<ul class="list-unstyled"><li>Модель: {esc(product["model"])}</li></ul>
+<ul class="list-unstyled"><li><h2>{money(product["price"])}</h2></li></ul>
+<div id="product"><label for="input-quantity">Кол-во</label>
+<input type="text" name="quantity" value="1" size="2" id="input-quantity" class="form-control">
+<input type="hidden" name="product_id" value="{product["id"]}">
+<button type="button" id="button-cart" class="btn btn-primary btn-lg btn-block">Купить</button></div>
+<div class="rating"><p><a href="" onclick="showTab('#tab-review'); return false;">Отзывов ({reviews})</a> /
+<a href="" onclick="showTab('#tab-review'); return false;">Написать отзыв</a></p></div>
+</div></div>"""
+        self._send(200, self._page(product["name"], content))
+
+    def write_review(self):
+        name, text, rating = self.form.get("name", ""), self.form.get("text", ""), self.form.get("rating", "")
+        if not 3 <= len(name) <= 25:
+            return self._json({"error": "Имя должно быть от 3 до 25 символов!"})
+        if not 25 <= len(text) <= 1000:
+            return self._json({"error": "Текст отзыва должен быть от 25 до 1000 символов!"})
+        if rating not in ("1", "2", "3", "4", "5"):
+            return self._json({"error": "Пожалуйста, выберите оценку!"})
+        with self.server.state.lock:
+            self.server.state.reviews.append({"product_id": int(self.form.get("product_id", 0)), "name": name,
+                                              "text": text, "rating": int(rating)})
+        self._json({"success": "Спасибо за ваш отзыв. Он поступил администратору на проверку."})
+
+    def cart_add(self):
+        try:
+            product = self.server.state.products[int(self.form.get("product_id", ""))]
+            quantity = max(1, int(self.form.get("quantity", "1")))
+        except (ValueError, KeyError):
+            return self._json({"error": {"product": "Товар не найден!"}})
+        cart = self.session["cart"]
+        cart[product["id"]] = cart.get(product["id"], 0) + quantity
+        link = url("product/product", product_id=product["id"])
+        self._json({
+            "success": f'Товар <a href="{link}">{esc(product["name"])}</a> добавлен в '
+                       f'<a href="{url("checkout/cart")}">корзину покупок</a>!',
+            "total": f"Товаров {sum(cart.values())} ({money(self._cart_total())})",
+        })
+
+    def _cart_rows(self):
+        products = self.server.state.products
+        return [(products[product_id], quantity) for product_id, quantity in self.session["cart"].items()]
+
+    def cart_info(self):
+        rows = "".join(
+            f'<tr><td class="text-left"><a href="{url("product/product", product_id=product["id"])}">{esc(product["name"])}</a></td>'
+            f'<td class="text-right">x {quantity}</td><td class="text-right">{money(product["price"] * quantity)}</td></tr>'
+            for product, quantity in self._cart_rows()
+        )
+        self._send(200, f'<ul class="dropdown-menu pull-right"><li><table class="table table-striped">{rows}</table></li></ul>')
+
+    def cart(self):
+        rows = "".join(
+            f'<tr><td class="text-left"><a href="{url("product/product", product_id=product["id"])}">{esc(product["name"])}</a></td>'
+            f'<td class="text-left">{esc(product["model"])}</td>'
+            f'<td class="text-left"><input type="text" name="quantity[{product["id"]}]" value="{quantity}" size="1" class="form-control"></td>'
+            f'<td class="text-right">{money(product["price"])}</td>'
+            f'<td class="text-right">{money(product["price"] * quantity)}</td></tr>'
+            for product, quantity in self._cart_rows()
+        )
+        if not rows:
+            return self._send(200, self._page("Корзина покупок", "<h1>Корзина покупок</h1><p>Ваша корзина пуста!</p>"))
+        content = f"""<h1>Корзина покупок</h1>
+<form><div class="table-responsive"><table class="table table-bordered"><thead><tr>
+<td class="text-left">Название</td><td class="text-left">Модель</td><td class="text-left">Количество</td>
+<td class="text-right">Цена за шт.</td><td class="text-right">Всего</td></tr></thead>
+<tbody>{rows}</tbody></table></div></form>
+<div class="row"><div class="col-sm-4 col-sm-offset-8"><table class="table table-bordered" id="cart-totals">
+<tr><td class="text-right"><strong>Итого:</strong></td><td class="text-right">{money(self._cart_total())}</td></tr>
+</table></div></div>"""
+        self._send(200, self._page("Корзина покупок", content))
+
+    def wishlist_add(self):
+        product = self.server.state.products.get(int(self.form.get("product_id", 0)))
+        if product is None:
+            return self._json({})
+        if product["id"] not in self.session["wishlist"]:
+            self.session["wishlist"].append(product["id"])
+        link = url("product/product", product_id=product["id"])
+        if self.session["customer"]:
+            message = (f'Товар <a href="{link}">{esc(product["name"])}</a> добавлен в '
+                       f'<a href="{url("account/wishlist")}">закладки</a>!')
+        else:
+            message = (f'Вы должны <a href="{url("account/login")}">войти</a>, чтобы сохранить '
+                       f'<a href="{link}">{esc(product["name"])}</a> в <a href="{url("account/wishlist")}">закладки</a>!')
+        self._json({"success": message, "total": f"Закладки ({len(self.session['wishlist'])})"})
+
+    def wishlist(self):
+        if not self.session["customer"]:
+            return self._redirect(url("account/login"))
+        products = self.server.state.products
+        rows = "".join(
+            f'<tr><td class="text-center"><img src="/image/{product_id}_0.png"></td>'
+            f'<td class="text-left"><a href="{url("product/product", product_id=product_id)}">{esc(products[product_id]["name"])}</a></td>'
+            f'<td class="text-left">{esc(products[product_id]["model"])}</td>'
+            f'<td class="text-right">В наличии</td>'
+            f'<td class="text-right"><div class="price">{money(products[product_id]["price"])}</div></td>'
+            f'<td class="text-right"><button type="button" class="btn btn-primary">Купить</button></td></tr>'
+            for product_id in self.session["wishlist"]
+        )
+        table = (f'<table class="table table-bordered table-hover"><thead><tr><td>Изображение</td><td>Название</td>'
+                 f'<td>Модель</td><td>Наличие</td><td>Цена за единицу</td><td>Действие</td></tr></thead>'
+                 f'<tbody>{rows}</tbody></table>') if rows else "<p>Ваши закладки пусты.</p>"
+        self._send(200, self._page("Мои закладки", f"<h2>Мои закладки</h2>{table}"))
+
+    def register_form(self, errors=None, values=None):
+        errors, values = errors or {}, values or {}
+        fields = [
+            ("firstname", "Имя", "text"), ("lastname", "Фамилия", "text"), ("email", "E-Mail", "email"),
+            ("telephone", "Телефон", "tel"), ("password", "Пароль", "password"), ("confirm", "Подтверждение пароля", "password"),
+        ]
+        inputs = "".join(
+            f'<div class="form-group required"><label for="input-{name}">{label}</label>'
+            f'<input type="{kind}" name="{name}" value="{esc(values.get(name, "")) if kind != "password" else ""}" '
+            f'placeholder="{label}" id="input-{name}" class="form-control">'
+            + (f'<div class="text-danger">{errors[name]}</div>' if name in errors else "") + "</div>"
+            for name, label, kind in fields
+        )
+        warning = f'<div class="alert alert-danger">{errors["warning"]}</div>' if "warning" in errors else ""
+        content = f"""<h1>Регистрация</h1>{warning}
+<form action="{url("account/register")}" method="post" class="form-horizontal">
+<fieldset id="account">{inputs}</fieldset>
+<div class="buttons"><div class="pull-right">Я прочитал <a href="#">Политику конфиденциальности</a> и согласен с условиями
+<input type="checkbox" name="agree" value="1"> <input type="submit" value="Продолжить" class="btn btn-primary"></div></div>
+</form>"""
+        self._send(200, self._page("Регистрация", content))
+
+    def register(self):
+        form, state = self.form, self.server.state
+        errors = {}
+        for name, message in (("firstname", "Имя должно быть от 1 до 32 символов!"),
+                              ("lastname", "Фамилия должна быть от 1 до 32 символов!"),
+                              ("telephone", "Телефон должен быть от 3 до 32 символов!")):
+            if not form.get(name):
+                errors[name] = message
+        email = form.get("email", "").strip().lower()
+        if "@" not in email:
+            errors["email"] = "E-Mail адрес введен неверно!"
+        elif email in state.accounts:
+            errors["warning"] = "Этот E-Mail уже зарегистрирован!"
+        if not 4 <= len(form.get("password", "")) <= 20:
+            errors["password"] = "Пароль должен быть от 4 до 20 символов!"
+        elif form.get("confirm") != form.get("password"):
+            errors["confirm"] = "Пароли не совпадают!"
+        if form.get("agree") != "1":
+            errors["warning"] = "Вы должны прочитать и согласиться с Политикой конфиденциальности!"
+        if errors:
+            return self.register_form(errors, form)
+
+        with state.lock:
+            state.accounts[email] = {"firstname": form["firstname"], "lastname": form["lastname"],
+                                     "telephone": form["telephone"], "password": form["password"]}
+        self.session["customer"] = email
+        self._redirect(url("account/success"))
+
+    def success(self):
+        self._send(200, self._page("Ваша учетная запись создана!",
+                                   "<h1>Ваша учетная запись создана!</h1><p>Поздравляем! Ваш Личный Кабинет был успешно создан.</p>"))
+
+    def login_form(self, warning=""):
+        content = f"""<h2>Зарегистрированный клиент</h2>{warning}
+<form action="{url("account/login")}" method="post">
+<input type="text" name="email" placeholder="E-Mail" id="input-email" class="form-control">
+<input type="password" name="password" placeholder="Пароль" id="input-password" class="form-control">
+<input type="submit" value="Войти" class="btn btn-primary"></form>"""
+        self._send(200, self._page("Авторизация", content))
+
+    def login(self):
+        email = self.form.get("email", "").strip().lower()
+        account = self.server.state.accounts.get(email)
+        if account is None or account["password"] != self.form.get("password"):
+            return self.login_form('<div class="alert alert-danger">Неправильно заполнены поле E-Mail и/или пароль!</div>')
+        self.session["customer"] = email
+        self._redirect(url("account/account"))
+
+    def logout(self):
+        self.session["customer"] = None
+        self._send(200, self._page("Выход", "<h1>Выход</h1><p>Вы вышли из Личного Кабинета.</p>"))
+
+    def account(self):
+        if not self.session["customer"]:
+            return self._redirect(url("account/login"))
+        self._send(200, self._page("Личный кабинет", "<h2>Моя учетная запись</h2>"))
+
+
+ROUTES = {
+    ("GET", "common/home"): ShopHandler.home,
+    ("GET", "product/search"): ShopHandler.search,
+    ("GET", "product/category"): ShopHandler.category,
+    ("GET", "product/product"): ShopHandler.product,
+    ("POST", "product/product/write"): ShopHandler.write_review,
+    ("POST", "checkout/cart/add"): ShopHandler.cart_add,
+    ("GET", "common/cart/info"): ShopHandler.cart_info,
+    ("GET", "checkout/cart"): ShopHandler.cart,
+    ("POST", "account/wishlist/add"): ShopHandler.wishlist_add,
+    ("GET", "account/wishlist"): ShopHandler.wishlist,
+    ("GET", "account/register"): ShopHandler.register_form,
+    ("POST", "account/register"): ShopHandler.register,
+    ("GET", "account/success"): ShopHandler.success,
+    ("GET", "account/login"): ShopHandler.login_form,
+    ("POST", "account/login"): ShopHandler.login,
+    ("GET", "account/logout"): ShopHandler.logout,
+    ("GET", "account/account"): ShopHandler.account,
+}
+
+
+class LocalOpenCart:
+    # Локальная замена demo-opencart.ru: те же маршруты и DOM, что трогают тесты
+    def __init__(self, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), ShopHandler)
+        self.server.daemon_threads = True
+        self.server.state = ShopState()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="local-opencart", daemon=True)
+        self._thread.start()
+        logger.info(f"Local OpenCart stand-in listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Локальная заглушка OpenCart для тестов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    shop = LocalOpenCart(args.host, args.port).start()
+    try:
+        shop._thread.join()
+    except KeyboardInterrupt:
+        shop.stop()
@@ -0,0 +1,177 @@
+import logging
+from collections import defaultdict
+
+from selenium.webdriver.common.by import By
+
+logger = logging.getLogger(__name__)
+
+# CSS-селектор с фильтром по тексту: значение — пара (селектор, подстрока)
+CSS_TEXT = "css text"
+
+# Стратегии элемента проверяются одним вызовом execute_script в переданном
+# порядке до первой удачной: для неё возвращается найденный узел и время
+# поиска в браузере. Медленные стратегии (XPath по тексту) проверяются все
+# разом лишь при каждом PROBE_EVERY-м поиске, чтобы ранжирование не устаревало.
+PROBE_EVERY = 20
+
+# Поиск одного элемента по стратегии Selenium внутри браузера;
+# используется всеми скриптами, которые работают с локаторами пачкой.
+FIND_ELEMENT_JS = """
+function findElement(by, value) {
+    if (by === 'id') {
+        return document.getElementById(value);
+    } else if (by === 'css selector') {
+        return document.querySelector(value);
+    } else if (by === 'css text') {
+        var nodes = document.querySelectorAll(value[0]);
+        for (var j = 0; j < nodes.length; j++) {
+            if (nodes[j].textContent.indexOf(value[1]) !== -1) { return nodes[j]; }
+        }
+        return null;
+    } else if (by === 'xpath') {
+        return document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    } else if (by === 'name') {
+        return document.getElementsByName(value)[0] || null;
+    } else if (by === 'tag name') {
+        return document.getElementsByTagName(value)[0] || null;
+    }
+    return null;
+}
+"""
+
+RESOLVE_SCRIPT = FIND_ELEMENT_JS + """
+var strategies = arguments[0], stopAtFirst = arguments[1], results = [];
+for (var i = 0; i < strategies.length; i++) {
+    var start = performance.now(), el = findElement(strategies[i][0], strategies[i][1]);
+    results.push([el, performance.now() - start]);
+    if (el !== null && stopAtFirst) { break; }
+}
+return results;
+"""
+
+
+class Locator:
+    # Логический элемент: стратегии перечислены по приоритету (id > CSS > XPath)
+    def __init__(self, name, *strategies):
+        self.name = name
+        self.strategies = strategies
+        self.key = (name, strategies)
+
+    def format(self, **params):
+        strategies = []
+        for by, value in self.strategies:
+            if isinstance(value, tuple):
+                strategies.append((by, tuple(part.format(**params) for part in value)))
+            else:
+                strategies.append((by, value.format(**params)))
+        return Locator(self.name, *strategies)
+
+    def __repr__(self):
+        return f"Locator({self.name!r})"
+
+
+class LocatorRegistry:
+    def __init__(self):
+        self.locators = {}
+        self.timings = defaultdict(lambda: defaultdict(list))
+        self.lookups = defaultdict(int)
+
+    def declare(self, name, *strategies):
+        locator = Locator(name, *strategies)
+        self.locators[name] = locator
+        return locator
+
+    def ranked(self, page, locator):
+        # Сначала стратегии, уже находившие элемент на этой странице, от самой
+        # быстрой к самой медленной; затем остальные в объявленном порядке.
+        stats = self.timings[(page, locator.name)]
+
+        def cost(index):
+            durations = stats.get(index)
+            if durations:
+                return (0, sum(durations) / len(durations))
+            return (1, index)
+
+        return sorted(range(len(locator.strategies)), key=cost)
+
+    def record(self, page, locator, index, duration):
+        self.timings[(page, locator.name)][index].append(duration)
+
+    def resolve(self, driver, page, locator):
+        order = self.ranked(page, locator)
+        self.lookups[(page, locator.name)] += 1
+        stop_at_first = self.lookups[(page, locator.name)] % PROBE_EVERY != 0
+        results = driver.execute_script(
+            RESOLVE_SCRIPT, [list(locator.strategies[index]) for index in order], stop_at_first
+        )
+
+        found = None
+        for index, (element, duration) in zip(order, results):
+            if element is not None:
+                self.record(page, locator, index, duration)
+                if found is None:
+                    found = element
+        return found
+
+    def summary(self):
+        lines = []
+        for (page, name), stats in sorted(self.timings.items()):
+            best = min(stats, key=lambda index: sum(stats[index]) / len(stats[index]))
+            by, value = self.locators[name].strategies[best]
+            mean = sum(stats[best]) / len(stats[best])
+            lines.append(f"{page}.{name}: {by}={value!r} ({mean:.3f} ms)")
+        return lines
+
+
+registry = LocatorRegistry()
+
+PRODUCT_LINK = registry.declare(
+    "product_link",
+    (CSS_TEXT, (".product-thumb h4 a", "{product_name}")),
+    (By.XPATH, "//a[contains(text(),'{product_name}')]"),
+)
+ACCOUNT_MENU = registry.declare(
+    "account_menu",
+    (By.CSS_SELECTOR, "a[title='Личный кабинет']"),
+    (By.XPATH, "//a[@title='Личный кабинет']"),
+)
+REGISTER_LINK = registry.declare(
+    "register_link",
+    (By.CSS_SELECTOR, ".dropdown-menu a[href*='route=account/register']"),
+    (By.XPATH, "//a[contains(text(),'Регистрация')]"),
+)
+COMPUTERS_MENU = registry.declare(
+    "computers_menu",
+    (By.CSS_SELECTOR, "#menu li.dropdown > a[href$='path=20']"),
+    (By.XPATH, "//a[contains(text(),'Компьютеры')]"),
+)
+PC_CATEGORY_LINK = registry.declare(
+    "pc_category_link",
+    (By.CSS_SELECTOR, "#menu a[href*='path=20_26']"),
+    (By.XPATH, "//a[contains(text(),'PC') and contains(@href,'path=20_26')]"),
+)
+PRODUCT_TITLE = registry.declare(
+    "product_title",
+    (By.CSS_SELECTOR, "#content h1"),
+    (By.XPATH, "//div[@id='content']//h1"),
+)
+WRITE_REVIEW_LINK = registry.declare(
+    "write_review_link",
+    (By.CSS_SELECTOR, "a[href='#tab-review']"),
+    (By.XPATH, "//a[contains(text(),'Написать отзыв')]"),
+)
+REVIEW_CONTINUE_BUTTON = registry.declare(
+    "review_continue_button",
+    (By.ID, "button-review"),
+    (By.XPATH, "//button[contains(text(),'Продолжить')]"),
+)
+REGISTER_CONTINUE_BUTTON = registry.declare(
+    "register_continue_button",
+    (By.CSS_SELECTOR, "#content input[type='submit'][value='Продолжить']"),
+    (By.XPATH, "//input[@value='Продолжить']"),
+)
+SUCCESS_HEADING = registry.declare(
+    "success_heading",
+    (By.CSS_SELECTOR, "#content > h1"),
+    (By.XPATH, "//div[@id='content']/h1"),
+)
@@ -0,0 +1,97 @@
+import filecmp
+import logging
+import os
+import shutil
+import uuid
+
+from jsonfile import read_json, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+WORKERS_DIR = ".workers"
+
+
+def worker_id(config=None):
+    if config is not None and hasattr(config, "workerinput"):
+        return config.workerinput["workerid"]
+    return os.environ.get("PYTEST_XDIST_WORKER", "main")
+
+
+def is_worker(config):
+    return hasattr(config, "workerinput")
+
+
+def worker_results_dir(report_dir, worker):
+    return os.path.join(report_dir, WORKERS_DIR, worker)
+
+
+def merge_worker_results(report_dir):
+    workers_root = os.path.join(report_dir, WORKERS_DIR)
+    if not os.path.isdir(workers_root):
+        return 0
+
+    merged = 0
+    for worker in sorted(os.listdir(workers_root)):
+        source_dir = os.path.join(workers_root, worker)
+        renamed = _move_attachments(source_dir, report_dir)
+        for name in sorted(os.listdir(source_dir)):
+            source = os.path.join(source_dir, name)
+            if name.endswith(".json"):
+                if renamed:
+                    _rewrite_sources(source, renamed)
+                target = os.path.join(report_dir, name)
+                if os.path.exists(target):
+                    if filecmp.cmp(source, target, shallow=False):
+                        continue
+                    target = os.path.join(report_dir, _fresh_name(name))
+                shutil.move(source, target)
+                merged += 1
+        shutil.rmtree(source_dir, ignore_errors=True)
+
+    shutil.rmtree(workers_root, ignore_errors=True)
+    logger.info(f"Merged {merged} Allure result files from worker directories")
+    return merged
+
+
+def _move_attachments(source_dir, report_dir):
+    # Имя вложения указано в JSON результата, поэтому при конфликте
+    # файл получает новое имя, а ссылки на него переписываются.
+    renamed = {}
+    for name in sorted(os.listdir(source_dir)):
+        if "-attachment" not in name:
+            continue
+        source = os.path.join(source_dir, name)
+        target = os.path.join(report_dir, name)
+        if os.path.exists(target):
+            if filecmp.cmp(source, target, shallow=False):
+                os.remove(source)
+                continue
+            new_name = _fresh_name(name)
+            renamed[name] = new_name
+            target = os.path.join(report_dir, new_name)
+        shutil.move(source, target)
+    return renamed
+
+
+def _rewrite_sources(path, renamed):
+    data = read_json(path)
+    if data is None:
+        return
+    _rename_in(data, renamed)
+    write_json_atomic(path, data)
+
+
+def _rename_in(node, renamed):
+    if isinstance(node, dict):
+        if node.get("source") in renamed:
+            node["source"] = renamed[node["source"]]
+        for value in node.values():
+            _rename_in(value, renamed)
+    elif isinstance(node, list):
+        for value in node:
+            _rename_in(value, renamed)
+
+
+def _fresh_name(name):
+    suffix = name.split("-", 5)[-1] if name.count("-") >= 5 else name
+    return f"{uuid.uuid4()}-{suffix}"
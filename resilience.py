@@ -0,0 +1,169 @@
+import functools
+import logging
+import threading
+import time
+
+import allure
+import pytest
+import requests
+from allure_commons.types import AttachmentType
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException, WebDriverException
+
+from jsonfile import read_json, write_json_atomic
+from parallel import is_worker
+
+logger = logging.getLogger(__name__)
+
+NETWORK = "network"
+STALE = "stale"
+TIMEOUT = "timeout"
+ASSERTION = "assertion"
+OTHER = "other"
+RETRYABLE = (NETWORK, STALE, TIMEOUT)
+
+NETWORK_MARKERS = ("about:neterror", "Reached error page", "NS_ERROR_NET", "NS_ERROR_CONNECTION",
+                   "NS_ERROR_UNKNOWN_HOST", "connectionFailure", "netTimeout", "dnsNotFound")
+
+INCLUDE = "include"
+EXCLUDE = "exclude"
+ONLY = "only"
+QUARANTINE_MODES = (INCLUDE, EXCLUDE, ONLY)
+
+
+def classify(error):
+    if isinstance(error, AssertionError):
+        return ASSERTION
+    if isinstance(error, StaleElementReferenceException):
+        return STALE
+    if isinstance(error, TimeoutException):
+        return TIMEOUT
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, ConnectionError)):
+        return NETWORK
+    if isinstance(error, WebDriverException) and any(marker in str(error) for marker in NETWORK_MARKERS):
+        return NETWORK
+    return OTHER
+
+
+class RetryTracker:
+    # Повторы шагов текущего теста; уходят в отчёт теста и в карантин
+    def __init__(self, retries=2, backoff=0.5, max_backoff=4.0):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.records = []
+        self._local = threading.local()
+
+    def begin_test(self):
+        self.records = []
+
+    def delay(self, attempt):
+        return min(self.max_backoff, self.backoff * 2 ** attempt)
+
+    def call(self, name, function, recover=None):
+        # Вложенные шаги повторяются только на внешнем уровне, иначе число
+        # попыток перемножается
+        if getattr(self._local, "active", False):
+            return function()
+        self._local.active = True
+        try:
+            for attempt in range(self.retries + 1):
+                try:
+                    return function()
+                except Exception as e:
+                    kind = classify(e)
+                    if kind not in RETRYABLE or attempt == self.retries:
+                        raise
+                    delay = self.delay(attempt)
+                    self.records.append({"step": name, "kind": kind, "attempt": attempt + 1,
+                                         "delay": delay, "error": str(e).splitlines()[0] if str(e) else type(e).__name__})
+                    logger.warning(f"Retrying {name} after {kind} failure in {delay:.1f}s: {str(e).strip()}")
+                    with allure.step(f"Повтор шага {name} ({kind}), попытка {attempt + 2}"):
+                        allure.attach(str(e), name=f"{kind}_error", attachment_type=AttachmentType.TEXT)
+                        time.sleep(delay)
+                        if recover is not None:
+                            recover()
+        finally:
+            self._local.active = False
+
+
+tracker = RetryTracker()
+
+
+def configure(retries, backoff=0.5, max_backoff=4.0):
+    global tracker
+    tracker = RetryTracker(retries, backoff, max_backoff)
+    return tracker
+
+
+def idempotent_step(method):
+    # Только для шагов page object, которые можно безопасно повторить:
+    # открытие страниц, чтение данных, заполнение формы без отправки
+    @functools.wraps(method)
+    def wrapper(page, *args, **kwargs):
+        return tracker.call(f"{type(page).__name__}.{method.__name__}",
+                            lambda: method(page, *args, **kwargs), page.forget_all)
+    return wrapper
+
+
+class Quarantine:
+    # Тесты, которым повторы понадобились в quarantine_after из последних
+    # window прогонов, попадают в карантин и по умолчанию не запускаются
+    # вместе с остальными: их гоняют отдельно с --quarantine only. Чистые
+    # прогоны в карантине постепенно возвращают тест в общий набор.
+    def __init__(self, config, path, mode=EXCLUDE, quarantine_after=3, window=5):
+        self.config = config
+        self.path = path
+        self.mode = mode
+        self.quarantine_after = quarantine_after
+        self.window = window
+        self.state = self.load()
+        self.retried = {}
+
+    def load(self):
+        return read_json(self.path, {"tests": {}})
+
+    def save(self):
+        write_json_atomic(self.path, self.state, indent=2, sort_keys=True)
+
+    def quarantined(self, nodeid):
+        return self.state["tests"].get(nodeid, {}).get("quarantined", False)
+
+    def pytest_collection_modifyitems(self, config, items):
+        if self.mode == INCLUDE:
+            return
+        keep = self.quarantined if self.mode == ONLY else (lambda nodeid: not self.quarantined(nodeid))
+        selected = [item for item in items if keep(item.nodeid)]
+        deselected = [item for item in items if not keep(item.nodeid)]
+        if deselected:
+            config.hook.pytest_deselected(items=deselected)
+            items[:] = selected
+
+    def pytest_runtest_logreport(self, report):
+        if report.when != "call" and not report.failed:
+            return
+        retries = sum(value for name, value in report.user_properties if name == "step_retries")
+        self.retried[report.nodeid] = self.retried.get(report.nodeid, 0) + retries
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session):
+        if is_worker(session.config):
+            return
+        for nodeid, retries in self.retried.items():
+            entry = self.state["tests"].setdefault(nodeid, {"runs": [], "quarantined": False})
+            entry["runs"] = (entry["runs"] + [retries])[-self.window:]
+            needed = sum(1 for count in entry["runs"] if count)
+            if not entry["quarantined"] and needed >= self.quarantine_after:
+                entry["quarantined"] = True
+                logger.warning(f"Quarantined {nodeid}: needed retries in {needed} of last {len(entry['runs'])} runs")
+            elif entry["quarantined"] and needed == 0:
+                entry["quarantined"] = False
+                logger.info(f"Released {nodeid} from quarantine")
+        self.save()
+
+    def pytest_terminal_summary(self, terminalreporter):
+        quarantined = sorted(nodeid for nodeid in self.state["tests"] if self.quarantined(nodeid))
+        if not quarantined:
+            return
+        terminalreporter.section(f"quarantine ({self.mode})")
+        for nodeid in quarantined:
+            terminalreporter.write_line(nodeid)
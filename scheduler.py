@@ -0,0 +1,248 @@
+import functools
+import glob
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+import urls
+from jsonfile import read_json, write_json_atomic
+from locators import Locator
+from parallel import is_worker
+
+logger = logging.getLogger(__name__)
+
+FAILED_STATUSES = ("failed", "broken")
+# Группы порядка запуска: недавно упавшие, нестабильные, новые, остальные
+LAST_FAILED, FLAKY, NEW, STABLE = range(4)
+
+
+def nodeid_of(result):
+    # fullName в Allure: "пакет.модуль#тест", name — имя теста с параметрами
+    package = result["fullName"].partition("#")[0]
+    return f"{package.replace('.', '/')}.py::{result['name']}"
+
+
+def read_allure_results(report_dir):
+    results = []
+    for path in glob.glob(os.path.join(report_dir, "*-result.json")):
+        result = read_json(path)
+        if result is None:
+            continue
+        if result.get("status") in (None, "skipped") or "fullName" not in result:
+            continue
+        results.append({
+            "nodeid": nodeid_of(result),
+            "status": result["status"],
+            "duration": round((result.get("stop", 0) - result.get("start", 0)) / 1000, 3),
+            "stop": result.get("stop", 0),
+        })
+    return results
+
+
+@functools.lru_cache(maxsize=None)
+def _source(obj):
+    return inspect.getsource(obj)
+
+
+def _code_names(code):
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= _code_names(const)
+    return names
+
+
+def _referenced(obj):
+    # Глобальные имена и атрибуты модулей (module.NAME), к которым обращается
+    # код объекта, разрешённые в модуле, где объект определён
+    if inspect.isclass(obj):
+        codes = [getattr(member, "__func__", getattr(member, "fget", member)) for member in vars(obj).values()]
+        codes = [inspect.unwrap(member).__code__ for member in codes if inspect.isfunction(member)]
+    else:
+        codes = [inspect.unwrap(obj).__code__]
+    names = set().union(*map(_code_names, codes)) if codes else set()
+    namespace = vars(sys.modules[obj.__module__])
+    for name in sorted(names):
+        value = namespace.get(name)
+        if inspect.ismodule(value):
+            for attr in sorted(names):
+                if attr in vars(value):
+                    yield f"{value.__name__}.{attr}", vars(value)[attr]
+        elif name in namespace:
+            yield name, value
+
+
+def _is_local(obj, root):
+    path = getattr(sys.modules.get(obj.__module__), "__file__", None)
+    return bool(path) and os.path.abspath(path).startswith(root) and "site-packages" not in path
+
+
+@functools.lru_cache(maxsize=None)
+def dependency_sources(function, root):
+    # Исходник теста плюс всё, что он затрагивает в тестовых модулях: классы
+    # page object с базовыми классами, вспомогательные функции, локаторы и константы
+    root = os.path.abspath(root)
+    parts, seen, pending = set(), set(), [function]
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        parts.add(f"{obj.__module__}.{obj.__qualname__}\n{_source(obj)}")
+        if inspect.isclass(obj):
+            pending.extend(base for base in obj.__bases__ if _is_local(base, root))
+        for name, value in _referenced(obj):
+            values = list(value.values()) if isinstance(value, dict) else [value]
+            for value in values:
+                if isinstance(value, Locator):
+                    parts.add(f"locator {value.name}\n{value.strategies!r}")
+                elif inspect.isclass(value) or inspect.isfunction(value):
+                    if _is_local(value, root):
+                        pending.append(value)
+                elif isinstance(value, (str, int, float, tuple)) and name.rpartition(".")[2].isupper():
+                    # Только константы (UPPER_CASE): base_url и прочее состояние меняется от прогона к прогону
+                    parts.add(f"constant {name}\n{value!r}")
+    return frozenset(parts)
+
+
+def infrastructure_digest(root):
+    # Всё, что не является тестовым модулем (conftest, ожидания, API магазина,
+    # пул драйверов и т.д.), хешируется целиком: до таких модулей тесты
+    # добираются через фикстуры и экземпляры, которые не видны в их коде
+    root = os.path.abspath(root)
+    digest = hashlib.sha1()
+    paths = {os.path.abspath(module.__file__) for module in list(sys.modules.values())
+             if getattr(module, "__file__", None)}
+    for path in sorted(paths):
+        if not path.startswith(root) or "site-packages" in path or not path.endswith(".py") \
+                or os.path.basename(path).startswith("test_"):
+            continue
+        digest.update(os.path.relpath(path, root).encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def run_profile(config):
+    # Зелёный прогон годится только для того же магазина и того же режима:
+    # успех на локальной заглушке ничего не говорит о демо. urls.shop_id
+    # выставляется в pytest_sessionstart, то есть до отбора тестов.
+    return "\n".join([
+        f"shop {urls.shop_id}",
+        f"interaction {config.getoption('--interaction', None)}",
+        f"block_resources {config.getoption('--block-resources', None)}",
+    ])
+
+
+def fingerprint(item, extra=""):
+    digest = hashlib.sha1(extra.encode("utf-8"))
+    for part in sorted(dependency_sources(item.function, str(item.config.rootpath))):
+        digest.update(part.encode("utf-8"))
+    callspec = getattr(item, "callspec", None)
+    if callspec is not None:
+        digest.update(json.dumps(callspec.params, sort_keys=True, ensure_ascii=False, default=repr).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class Scheduler:
+    # Порядок и выборка тестов по истории прошлых прогонов. История берётся из
+    # результатов Allure и хранится в отдельном файле, чтобы переживать
+    # --clean-alluredir. Воркеры xdist читают один и тот же файл, поэтому
+    # порядок и пропуски у всех воркеров совпадают.
+    def __init__(self, config, history_path, runs=10, full_run=False):
+        self.config = config
+        self.history_path = history_path
+        self.runs = runs
+        self.full_run = full_run
+        self.history = self.load()
+        self.outcomes = {}
+        self.fingerprints = {}
+
+    def load(self):
+        return read_json(self.history_path, {"tests": {}})
+
+    def save(self):
+        write_json_atomic(self.history_path, self.history, indent=2, sort_keys=True)
+
+    def ingest(self, report_dir):
+        added = 0
+        for result in sorted(read_allure_results(report_dir), key=lambda result: result["stop"]):
+            entry = self.history["tests"].setdefault(result["nodeid"], {"runs": []})
+            if entry["runs"] and result["stop"] <= entry["runs"][-1]["stop"]:
+                continue
+            entry["runs"].append({field: result[field] for field in ("status", "duration", "stop")})
+            del entry["runs"][:-self.runs]
+            added += 1
+        if added:
+            logger.info(f"Test history: {added} new results from {report_dir}")
+
+    def group(self, nodeid):
+        runs = self.history["tests"].get(nodeid, {}).get("runs")
+        if not runs:
+            return NEW
+        if runs[-1]["status"] in FAILED_STATUSES:
+            return LAST_FAILED
+        if any(run["status"] in FAILED_STATUSES for run in runs):
+            return FLAKY
+        return STABLE
+
+    def duration(self, nodeid):
+        runs = self.history["tests"].get(nodeid, {}).get("runs")
+        return sum(run["duration"] for run in runs) / len(runs) if runs else 0.0
+
+    def unchanged(self, nodeid, current):
+        entry = self.history["tests"].get(nodeid, {})
+        return entry.get("last_outcome") == "passed" and entry.get("green") == current
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, config, items):
+        skip = pytest.mark.skip(reason="тест, page objects и инфраструктура не менялись с последнего зелёного прогона "
+                                       "на этом магазине в этом режиме (--full-run, чтобы запустить)")
+        skipped = 0
+        base = f"{run_profile(config)}\n{infrastructure_digest(str(config.rootpath))}"
+        for item in items:
+            if not isinstance(item, pytest.Function):
+                continue
+            current = fingerprint(item, base)
+            item.user_properties.append(("fingerprint", current))
+            if not self.full_run and self.unchanged(item.nodeid, current):
+                item.add_marker(skip)
+                skipped += 1
+        # Длинные тесты раньше: при раздаче xdist они расходятся по разным
+        # воркерам, а не достаются одному в конце прогона
+        items.sort(key=lambda item: (self.group(item.nodeid), -self.duration(item.nodeid)))
+        if skipped:
+            logger.info(f"Impact selection: {skipped} unchanged tests skipped")
+
+    def pytest_runtest_logreport(self, report):
+        if report.skipped:
+            self.outcomes.setdefault(report.nodeid, "skipped")
+            return
+        if report.failed:
+            self.outcomes[report.nodeid] = "failed"
+        elif report.when == "call":
+            self.outcomes.setdefault(report.nodeid, "passed")
+        for name, value in report.user_properties:
+            if name == "fingerprint":
+                self.fingerprints[report.nodeid] = value
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_sessionfinish(self, session):
+        if is_worker(session.config):
+            return
+        report_dir = getattr(session.config.option, "allure_report_dir", None)
+        if report_dir:
+            self.ingest(report_dir)
+        for nodeid, outcome in self.outcomes.items():
+            if outcome == "skipped":
+                continue
+            entry = self.history["tests"].setdefault(nodeid, {"runs": []})
+            entry["last_outcome"] = outcome
+            if outcome == "passed" and nodeid in self.fingerprints:
+                entry["green"] = self.fingerprints[nodeid]
+        self.save()
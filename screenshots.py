@@ -0,0 +1,60 @@
+import base64
+import logging
+from collections import deque
+
+import allure
+from allure_commons.types import AttachmentType
+from selenium.common.exceptions import WebDriverException
+
+logger = logging.getLogger(__name__)
+
+ALWAYS = "always"
+ON_FAILURE = "on_failure"
+RING = "ring"
+MODES = (ALWAYS, ON_FAILURE, RING)
+
+
+class ScreenshotPolicy:
+    def __init__(self, mode=ALWAYS, ring_size=5):
+        if mode not in MODES:
+            raise ValueError(f"Unknown screenshot mode: {mode}")
+        self.mode = mode
+        self._ring = deque(maxlen=ring_size)
+
+    def capture(self, driver, name):
+        if self.mode == ON_FAILURE:
+            return
+        # Скриншот снимается так же, как раньше, но хранится в base64
+        # до тех пор, пока не понадобится во вложении.
+        data = driver.get_screenshot_as_base64()
+        if self.mode == ALWAYS:
+            self._attach(name, data)
+        else:
+            self._ring.append((name, data))
+
+    def test_finished(self, failed, driver=None):
+        if failed:
+            for name, data in self._ring:
+                self._attach(name, data)
+            if driver is not None:
+                try:
+                    self._attach("failure_screenshot", driver.get_screenshot_as_base64())
+                except WebDriverException as e:
+                    logger.warning(f"Could not capture failure screenshot: {str(e)}")
+        self._ring.clear()
+
+    def _attach(self, name, data):
+        allure.attach(base64.b64decode(data), name=name, attachment_type=AttachmentType.PNG)
+
+
+policy = ScreenshotPolicy()
+
+
+def configure(mode, ring_size):
+    global policy
+    policy = ScreenshotPolicy(mode, ring_size)
+    return policy
+
+
+def take_screenshot(driver, name):
+    policy.capture(driver, name)
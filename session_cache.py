@@ -0,0 +1,98 @@
+import logging
+import os
+import re
+import time
+
+import urls
+from api_session import ShopApi, inject_cookies
+from jsonfile import read_json, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 3600
+
+WRITE_STORAGE_SCRIPT = """
+var snapshot = arguments[0];
+Object.keys(snapshot.local_storage || {}).forEach(function (key) {
+    window.localStorage.setItem(key, snapshot.local_storage[key]);
+});
+Object.keys(snapshot.session_storage || {}).forEach(function (key) {
+    window.sessionStorage.setItem(key, snapshot.session_storage[key]);
+});
+"""
+
+
+class SnapshotCache:
+    def __init__(self, directory, ttl=DEFAULT_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, re.sub(r"[^\w.-]+", "_", key) + ".json")
+
+    def load(self, key):
+        snapshot = read_json(self.path(key))
+        if snapshot is None:
+            return None
+        if time.time() - snapshot.get("created", 0) > self.ttl:
+            logger.info(f"Snapshot '{key}' expired")
+            return None
+        return snapshot
+
+    def save(self, key, snapshot):
+        snapshot["created"] = time.time()
+        write_json_atomic(self.path(key), snapshot)
+
+    def invalidate(self, key):
+        if os.path.exists(self.path(key)):
+            os.remove(self.path(key))
+
+
+def restore_snapshot(driver, snapshot, base_url=None):
+    # Хранилища, как и cookies, пишутся уже на домене магазина
+    inject_cookies(driver, snapshot["cookies"], base_url)
+    driver.execute_script(WRITE_STORAGE_SCRIPT, snapshot)
+
+
+def api_snapshot(api):
+    return {"cookies": api.cookies(), "local_storage": {}, "session_storage": {}}
+
+
+def cart_scenario(product_name, quantity):
+    def build():
+        api = ShopApi()
+        api.add_to_cart(api.find_product_id(product_name), quantity)
+        return api_snapshot(api)
+
+    def validate(snapshot):
+        return ShopApi.from_cookies(snapshot["cookies"]).cart_quantity(product_name) == quantity
+
+    return build, validate
+
+
+# Сценарий -> (построение состояния, проверка, что сервер его ещё принимает).
+# Снимок — одна серверная сессия, общая для всех тестов и воркеров на время
+# жизни кэша, поэтому восстанавливать его можно только в тестах, которые
+# состояние читают: любое изменение корзины увидят остальные, а проверка
+# отбракует снимок и он будет пересобран.
+SCENARIOS = {
+    "cart with Nikon D300 x3": cart_scenario("Nikon D300", 3),
+}
+
+
+def restore_scenario(driver, cache, scenario):
+    build, validate = SCENARIOS[scenario]
+    # Снимки разных магазинов (демо и локальная заглушка) хранятся раздельно
+    key = f"{urls.shop_id} {scenario}"
+    snapshot = cache.load(key)
+    if snapshot is not None and not validate(snapshot):
+        logger.info(f"Snapshot '{scenario}' rejected by server, rebuilding")
+        cache.invalidate(key)
+        snapshot = None
+    if snapshot is None:
+        logger.info(f"Building snapshot '{scenario}'")
+        snapshot = build()
+        cache.save(key, snapshot)
+    restore_snapshot(driver, snapshot)
+    return snapshot
@@ -0,0 +1,72 @@
+import json
+import pytest
+import allure
+from allure_commons.types import AttachmentType
+
+from api_session import generate_random_email
+from benchmark import regressions
+from test_opencart import HomePage
+
+pytestmark = pytest.mark.benchmark
+
+
+def open_product(browser, product_name="iPhone"):
+    home_page = HomePage(browser)
+    home_page.open()
+    return home_page.go_to_product_page(product_name)
+
+
+def register(browser):
+    home_page = HomePage(browser)
+    home_page.open()
+    register_page = home_page.go_to_register_page()
+    return lambda: register_page.register_user(
+        firstname="Иван",
+        lastname="Петров",
+        email=generate_random_email(),
+        telephone="+79123456789",
+        password="TestPassword123"
+    ).get_success_message()
+
+
+def search_iphone(browser):
+    home_page = HomePage(browser)
+    home_page.open()
+    return lambda: home_page.search_product("iPhone").get_product_records()
+
+
+def open_iphone(browser):
+    home_page = HomePage(browser)
+    home_page.open()
+    return lambda: home_page.go_to_product_page("iPhone").get_product_title()
+
+
+# Сценарий -> подготовка, возвращающая измеряемое действие
+JOURNEYS = {
+    "open_home": lambda browser: HomePage(browser).open,
+    "search_iphone": search_iphone,
+    "open_product": open_iphone,
+    "add_to_cart": lambda browser: open_product(browser).add_to_cart,
+    "add_to_wishlist": lambda browser: open_product(browser).add_to_wishlist,
+    "register": register,
+}
+
+
+@allure.feature("Бенчмарки пользовательских сценариев")
+@pytest.mark.parametrize("journey", list(JOURNEYS))
+def test_journey_latency(journey, browser, benchmark_recorder, benchmark_settings):
+    with allure.step(f"Бенчмарк сценария {journey}: {benchmark_settings['rounds']} прогонов"):
+        for _ in range(benchmark_settings["rounds"]):
+            if browser.current_url.startswith("http"):
+                browser.delete_all_cookies()
+            action = JOURNEYS[journey](browser)
+            with benchmark_recorder.measure(journey):
+                action()
+
+        results = benchmark_recorder.results(journey)
+        allure.attach(json.dumps(results, ensure_ascii=False, indent=2), name=f"{journey}_latency",
+                      attachment_type=AttachmentType.JSON)
+
+        lines = regressions(journey, results, benchmark_settings["baseline"],
+                            benchmark_settings["threshold"], benchmark_settings["min_delta"])
+        assert not lines, f"Journey '{journey}' regressed against baseline:\n" + "\n".join(lines)
@@ -1,66 +1,317 @@
 import pytest
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
-import time
-import random
-import string
+from selenium.common.exceptions import StaleElementReferenceException
 import logging
+import re
 import allure
-from allure_commons.types import AttachmentType
+
+import interaction
+import locators
+import resilience
+import timing
+import urls
+import waits
+from api_session import generate_random_email
+from locators import FIND_ELEMENT_JS, Locator
+from screenshots import take_screenshot
 
 # Настройка логгирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Готовность страницы: вместо фиксированных пауз ждём события в самом браузере
+DOM_QUIET_MS = 300
+
+# Один вызов execute_script проверяет сразу все условия готовности:
+# загрузку документа, отсутствие активных AJAX-запросов jQuery и
+# "тишину" DOM (ни одной мутации за последние arguments[0] мс).
+# При arguments[1] тот же вызов отключает анимации: готовность проверяется
+# на каждом новом документе, в том числе открытом кликом.
+PAGE_READY_SCRIPT = """
+if (document.readyState !== 'complete') { return false; }
+if (arguments[1]) {""" + interaction.NO_ANIMATION_SCRIPT + """}
+if (window.jQuery && window.jQuery.active > 0) { return false; }
+if (!window.__domQuiet) {
+    window.__domQuiet = {last: Date.now()};
+    new MutationObserver(function () { window.__domQuiet.last = Date.now(); })
+        .observe(document, {childList: true, subtree: true, attributes: true});
+    return false;
+}
+return Date.now() - window.__domQuiet.last >= arguments[0];
+"""
+
+IMAGE_LOADED_SCRIPT = """
+var img = document.querySelector(arguments[0]);
+return !!img && img.complete && img.naturalWidth > 0;
+"""
+
+# Заполнение формы одним вызовом: значение выставляется через нативный
+# сеттер (как при вводе), затем генерируются события input и change.
+# Флажки и переключатели приводятся к нужному состоянию кликом.
+# Возвращается список полей, которые заполнить не удалось.
+FILL_FORM_SCRIPT = FIND_ELEMENT_JS + """
+var fields = arguments[0], errors = [];
+fields.forEach(function (field) {
+    var name = field[1], value = field[2], el = findElement(field[0], field[1]);
+    if (!el) { errors.push(name + ': не найдено'); return; }
+    if (el.disabled || el.readOnly) { errors.push(name + ': недоступно для ввода'); return; }
+    if (el.type === 'checkbox' || el.type === 'radio') {
+        if (el.checked !== value) { el.click(); }
+        if (el.checked !== value) { errors.push(name + ': состояние не изменилось'); }
+        return;
+    }
+    var proto = el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype
+        : el.tagName === 'SELECT' ? HTMLSelectElement.prototype : HTMLInputElement.prototype;
+    el.focus();
+    Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+    el.dispatchEvent(new Event('input', {bubbles: true}));
+    el.dispatchEvent(new Event('change', {bubbles: true}));
+    el.blur();
+    if (el.value !== value) { errors.push(name + ': значение не применилось'); }
+});
+return errors;
+"""
+
+# Табличные данные страницы одним вызовом: для каждой строки arguments[0]
+# поля arguments[1] = {имя: [CSS внутри строки, что читать]} читаются как
+# text, value, href или price (цена со скидкой, без строки "Без НДС").
+EXTRACT_ROWS_SCRIPT = """
+function priceText(el) {
+    var special = el.querySelector('.price-new, b');
+    if (special) { return special.textContent.trim(); }
+    var text = '';
+    el.childNodes.forEach(function (node) { if (node.nodeType === 3) { text += node.textContent; } });
+    return text.trim() || el.textContent.trim();
+}
+var fields = arguments[1];
+return Array.prototype.map.call(document.querySelectorAll(arguments[0]), function (row) {
+    var record = {};
+    Object.keys(fields).forEach(function (name) {
+        var selector = fields[name][0], mode = fields[name][1];
+        var el = row.querySelector(selector);
+        record[name] = !el ? null
+            : mode === 'value' ? el.value
+            : mode === 'href' ? el.href
+            : mode === 'price' ? priceText(el)
+            : el.textContent.trim();
+    });
+    return record;
+});
+"""
+
+
+def page_is_ready(dom_quiet_ms=DOM_QUIET_MS, no_animations=False):
+    def condition(driver):
+        return driver.execute_script(PAGE_READY_SCRIPT, dom_quiet_ms, no_animations)
+    return condition
+
+
+def image_is_loaded(css_selector):
+    def condition(driver):
+        return driver.execute_script(IMAGE_LOADED_SCRIPT, css_selector)
+    return condition
+
+
+def alert_success_visible():
+    return EC.visibility_of_element_located((By.CSS_SELECTOR, "div.alert-success"))
+
+
+def registered_element(page, locator, check=None):
+    # Ожидание элемента из реестра локаторов: закэшированная ссылка
+    # сбрасывается, как только браузер сообщает, что она устарела.
+    def condition(driver):
+        element = page.resolve(locator)
+        if element is None:
+            return False
+        try:
+            if check is None:
+                # Ссылку из кэша всё равно нужно опросить: is_enabled — самый
+                # дешёвый запрос, который падает на устаревшем элементе
+                element.is_enabled()
+                return element
+            return element if check(element) else False
+        except StaleElementReferenceException:
+            page.forget(locator)
+            return False
+    return condition
+
+
+def parse_price(text):
+    # "1,202.00р." / "$602.00" -> 1202.0
+    number = re.search(r"\d[\d\s,]*(?:\.\d+)?", text).group(0)
+    return float(re.sub(r"[\s,]", "", number))
+
+
+def is_visible(element):
+    return element.is_displayed()
+
+
+def is_clickable(element):
+    return element.is_displayed() and element.is_enabled()
+
+
+def review_form_fields(name, text, rating):
+    return {
+        (By.CSS_SELECTOR, "#form-review input[name='name']"): name,
+        (By.CSS_SELECTOR, "#form-review textarea[name='text']"): text,
+        (By.CSS_SELECTOR, f"#form-review input[name='rating'][value='{rating}']"): True,
+    }
+
+
 class BasePage:
     def __init__(self, browser, url):
         self.browser = browser
         self.url = url
+        self._elements = {}
 
+    @resilience.idempotent_step
     def open(self):
-        with allure.step(f"Открытие страницы {self.url}"):
+        # Заголовок шага без адреса: по заголовкам бенчмарки сопоставляют
+        # замеры методов, а у локальной заглушки и прокси порт случайный
+        with allure.step(f"Открытие страницы {type(self).__name__}"):
             logger.info(f"Opening page: {self.url}")
+            self._elements.clear()
             self.browser.get(self.url)
-            time.sleep(2)
-            allure.attach(self.browser.get_screenshot_as_png(), name="page_screenshot", attachment_type=AttachmentType.PNG)
-
-    def element(self, locator):
-        return WebDriverWait(self.browser, 15).until(
-            EC.presence_of_element_located(locator)
-        )
-
-    def clickable_element(self, locator):
-        return WebDriverWait(self.browser, 15).until(
-            EC.element_to_be_clickable(locator)
-        )
-
-    def visible_element(self, locator):
-        return WebDriverWait(self.browser, 15).until(
-            EC.visibility_of_element_located(locator)
-        )
+            self.wait_until_ready()
+            self.screenshot("page_screenshot")
+
+    def screenshot(self, name):
+        take_screenshot(self.browser, name)
+
+    @timing.timed_wait
+    def wait_for(self, condition, timeout=None, key=None):
+        return waits.engine.until(self.browser, condition, timeout, key)
+
+    def wait_key(self, kind, locator):
+        return waits.wait_key(type(self).__name__, kind, locator)
+
+    def is_absent(self, locator):
+        return waits.engine.absent(self.browser, locator)
+
+    def wait_until_gone(self, locator, timeout=5):
+        # Отсутствующий элемент — ожидаемый исход: проверяем сразу, без опроса
+        if self.is_absent(locator):
+            return True
+        return self.wait_for(EC.invisibility_of_element_located(locator), timeout)
+
+    def wait_until_ready(self, timeout=None, dom_quiet_ms=DOM_QUIET_MS):
+        return self.wait_for(page_is_ready(dom_quiet_ms, interaction.is_fast()), timeout,
+                             key=f"{type(self).__name__}.ready")
+
+    def navigate_to(self, locator):
+        # Переход по ссылке из меню без наведения: href берётся у скрытого пункта
+        href = self.element(locator).get_attribute("href")
+        logger.info(f"Navigating directly to {href}")
+        self.forget_all()
+        self.browser.get(href)
+        self.wait_until_ready()
+
+    def click_to_navigate(self, element, url_part=None):
+        # Старый документ уже загружен и "тих", поэтому готовность проверяется
+        # только после того, как прежний <html> устарел и адрес сменился
+        old_document = self.browser.find_element(By.TAG_NAME, "html")
+        element.click()
+        self.forget_all()
+        self.wait_for(EC.staleness_of(old_document), key=f"{type(self).__name__}.navigation")
+        if url_part:
+            self.wait_for(EC.url_contains(url_part), key=f"{type(self).__name__}.url")
+        return self.wait_until_ready()
+
+    def click_and_wait(self, locator, post_condition, timeout=None):
+        self.clickable_element(locator).click()
+        return self.wait_for(post_condition, timeout)
+
+    def resolve(self, locator):
+        element = self._elements.get(locator.key)
+        if element is None:
+            element = locators.registry.resolve(self.browser, type(self).__name__, locator)
+            if element is not None:
+                self._elements[locator.key] = element
+        return element
+
+    def forget(self, locator):
+        self._elements.pop(locator.key, None)
+
+    def forget_all(self):
+        self._elements.clear()
+
+    @resilience.idempotent_step
+    def fill_form(self, fields, keystrokes=False):
+        # fields: {локатор: значение}; True/False — состояние флажка или переключателя.
+        # keystrokes=True вводит значения посимвольно, как раньше, для тестов самого ввода.
+        if keystrokes:
+            for locator, value in fields.items():
+                if isinstance(value, bool):
+                    element = self.clickable_element(locator)
+                    if element.is_selected() != value:
+                        self.browser.execute_script("arguments[0].click();", element)
+                else:
+                    # Поле очищается перед вводом, чтобы повтор шага не дописал значение второй раз
+                    element = self.visible_element(locator)
+                    element.clear()
+                    element.send_keys(value)
+            return
+
+        self.visible_element(next(iter(fields)))
+        errors = self.browser.execute_script(FILL_FORM_SCRIPT, [
+            [by, value, field_value if isinstance(field_value, bool) else str(field_value)]
+            for (by, value), field_value in fields.items()
+        ])
+        if errors:
+            raise AssertionError(f"Не удалось заполнить форму: {'; '.join(errors)}")
+
+    def extract_rows(self, row_selector, fields):
+        # Строки таблицы или списка как словари, без WebElement на каждую ячейку
+        return self.browser.execute_script(EXTRACT_ROWS_SCRIPT, row_selector, fields)
+
+    @timing.timed_wait
+    def element(self, locator, timeout=None):
+        if isinstance(locator, Locator):
+            condition = registered_element(self, locator)
+        else:
+            condition = EC.presence_of_element_located(locator)
+        return self.wait_for(condition, timeout, key=self.wait_key("present", locator))
+
+    @timing.timed_wait
+    def clickable_element(self, locator, timeout=None):
+        if isinstance(locator, Locator):
+            condition = registered_element(self, locator, is_clickable)
+        else:
+            condition = EC.element_to_be_clickable(locator)
+        return self.wait_for(condition, timeout, key=self.wait_key("clickable", locator))
+
+    @timing.timed_wait
+    def visible_element(self, locator, timeout=None):
+        if isinstance(locator, Locator):
+            condition = registered_element(self, locator, is_visible)
+        else:
+            condition = EC.visibility_of_element_located(locator)
+        return self.wait_for(condition, timeout, key=self.wait_key("visible", locator))
 
 
 class HomePage(BasePage):
-    def __init__(self, browser):
-        super().__init__(browser, "https://demo-opencart.ru/index.php?route=common/home")
+    def __init__(self, browser, base_url=None):
+        super().__init__(browser, urls.route_url("common/home", base=base_url))
 
     def go_to_product_page(self, product_name):
         with allure.step(f"Переход на страницу товара {product_name}"):
             logger.info(f"Going to product page: {product_name}")
-            product_link = self.clickable_element((By.XPATH, f"//a[contains(text(),'{product_name}')]"))  
-            product_link.click()
+            product_link = self.clickable_element(locators.PRODUCT_LINK.format(product_name=product_name))
+            self.click_to_navigate(product_link, "route=product/product")
             return ProductPage(self.browser)
 
     def go_to_register_page(self):
         with allure.step("Переход на страницу регистрации"):
             logger.info("Navigating to registration page")
-            account_menu = self.clickable_element((By.XPATH, "//a[@title='Личный кабинет']"))
+            if interaction.is_fast():
+                self.navigate_to(locators.REGISTER_LINK)
+                return RegisterPage(self.browser)
+            account_menu = self.clickable_element(locators.ACCOUNT_MENU)
             account_menu.click()
-            register_link = self.clickable_element((By.XPATH, "//a[contains(text(),'Регистрация')]"))
-            register_link.click()
+            register_link = self.clickable_element(locators.REGISTER_LINK)
+            self.click_to_navigate(register_link, "route=account/register")
             return RegisterPage(self.browser)
 
     def search_product(self, query):
@@ -69,179 +320,199 @@ class HomePage(BasePage):
             search_input = self.visible_element((By.CSS_SELECTOR, "input[name='search']"))
             search_input.clear()
             search_input.send_keys(query)
-            allure.attach(self.browser.get_screenshot_as_png(), name="search_input", attachment_type=AttachmentType.PNG)
+            self.screenshot("search_input")
             search_button = self.clickable_element((By.CSS_SELECTOR, "#search button"))
-            search_button.click()
+            self.click_to_navigate(search_button, "route=product/search")
             return SearchResultsPage(self.browser)
 
     def open_pc_category(self):
         with allure.step("Открытие категории PC через меню"):
             logger.info("Opening PC category via menu")
-            computers_menu = self.visible_element((By.XPATH, "//a[contains(text(),'Компьютеры')]"))
+            if interaction.is_fast():
+                self.navigate_to(locators.PC_CATEGORY_LINK)
+                return self.browser
+            computers_menu = self.visible_element(locators.COMPUTERS_MENU)
             ActionChains(self.browser).move_to_element(computers_menu).perform()
-            time.sleep(1)
-            pc_link = self.clickable_element((By.XPATH, "//a[contains(text(),'PC') and contains(@href,'path=20_26')]"))
-            pc_link.click()
+            pc_link = self.clickable_element(locators.PC_CATEGORY_LINK)
+            self.click_to_navigate(pc_link, "path=20_26")
             return self.browser
 
 
 class ProductPage(BasePage):
-    def __init__(self, browser):
-        super().__init__(browser, browser.current_url)
+    def __init__(self, browser, url=None):
+        super().__init__(browser, url or browser.current_url)
 
+    @resilience.idempotent_step
     def get_product_title(self):
         with allure.step("Получение заголовка товара"):
-            title = WebDriverWait(self.browser, 15).until(
-                EC.visibility_of_element_located((By.XPATH, "//div[@id='content']//h1"))
-            ).text
+            title = self.visible_element(locators.PRODUCT_TITLE).text
             logger.info(f"Product title: {title}")
             return title
     
     def click_all_thumbnails(self):
+        if interaction.is_fast():
+            return self.check_thumbnail_targets()
         with allure.step("Клики по всем превью изображений товара"):
             logger.info("Clicking all product thumbnails")
-            thumbnails = WebDriverWait(self.browser, 15).until(
-                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "ul.thumbnails li a.thumbnail"))
+            thumbnails = self.wait_for(
+                EC.presence_of_all_elements_located((By.CSS_SELECTOR, "ul.thumbnails li a.thumbnail")),
+                key=self.wait_key("present", (By.CSS_SELECTOR, "ul.thumbnails li a.thumbnail"))
             )
 
+            # Ошибка одного превью не прерывает обход, но тест по итогам падает
+            errors = []
             for i, thumbnail in enumerate(thumbnails):
                 try:
                     self.browser.execute_script("arguments[0].scrollIntoView();", thumbnail)
                     thumbnail.click()
-                    time.sleep(1) 
-           
-                    WebDriverWait(self.browser, 5).until(
-                        EC.visibility_of_element_located((By.CSS_SELECTOR, ".mfp-image"))
-                    )
-                    allure.attach(self.browser.get_screenshot_as_png(), 
-                                name=f"thumbnail_{i}_preview", 
-                                attachment_type=AttachmentType.PNG)
-
-                    close_button = WebDriverWait(self.browser, 5).until(
-                        EC.element_to_be_clickable((By.CSS_SELECTOR, "button.mfp-close"))
-                    )
+
+                    self.visible_element((By.CSS_SELECTOR, ".mfp-image"), timeout=5)
+                    self.wait_for(image_is_loaded("img.mfp-img"), timeout=5)
+                    self.screenshot(f"thumbnail_{i}_preview")
+
+                    close_button = self.clickable_element((By.CSS_SELECTOR, "button.mfp-close"), timeout=5)
                     close_button.click()
 
-                    WebDriverWait(self.browser, 5).until(
-                        EC.invisibility_of_element_located((By.CSS_SELECTOR, ".mfp-content"))
-                    )  
+                    self.wait_until_gone((By.CSS_SELECTOR, ".mfp-content"))
                 except Exception as e:
                     logger.error(f"Ошибка при обработке превью {i+1}: {str(e)}")
-                    allure.attach(self.browser.get_screenshot_as_png(), 
-                                name=f"thumbnail_error_{i}", 
-                                attachment_type=AttachmentType.PNG)
-                    continue
+                    self.screenshot(f"thumbnail_error_{i}")
+                    errors.append(f"превью {i + 1}: {type(e).__name__}: {str(e).strip()}")
+            assert not errors, f"Не удалось открыть превью: {'; '.join(errors)}"
     
+    @resilience.idempotent_step
+    def check_thumbnail_targets(self):
+        with allure.step("Проверка загрузки всех изображений из превью"):
+            selector = "ul.thumbnails li a.thumbnail"
+            self.element((By.CSS_SELECTOR, selector))
+            results = self.browser.execute_async_script(interaction.IMAGES_LOADED_SCRIPT, selector)
+            logger.info(f"Checked {len(results)} thumbnail targets")
+            self.screenshot("thumbnails")
+            broken = [result["url"] for result in results if not result["loaded"]]
+            assert not broken, f"Изображения превью не загрузились: {broken}"
+            return results
+
+    def add_to_cart(self, quantity=None):
+        with allure.step("Добавление товара в корзину"):
+            logger.info(f"Adding product to cart (quantity: {quantity})")
+            if quantity is not None:
+                quantity_input = self.clickable_element((By.CSS_SELECTOR, "input[name='quantity']"))
+                quantity_input.clear()
+                quantity_input.send_keys(str(quantity))
+
+            return self.click_and_wait((By.CSS_SELECTOR, "button#button-cart"),
+                                       alert_success_visible())
+
     def add_to_wishlist(self):
         with allure.step("Добавление товара в список желаний"):
             logger.info("Adding product to wishlist")
-            wishlist_button = self.clickable_element((By.CSS_SELECTOR, "button[data-original-title='В закладки']"))
-            wishlist_button.click()
-        
-            WebDriverWait(self.browser, 15).until(
-                EC.visibility_of_element_located((By.CSS_SELECTOR, "div.alert-success"))
-            ) 
-            allure.attach(self.browser.get_screenshot_as_png(), 
-                         name="wishlist_success", 
-                         attachment_type=AttachmentType.PNG)
+            self.click_and_wait((By.CSS_SELECTOR, "button[data-original-title='В закладки']"),
+                                alert_success_visible())
+            self.screenshot("wishlist_success")
         
             return self.browser
     
-    def write_review(self, name, text, rating=5):
+    def write_review(self, name, text, rating=5, keystrokes=False):
         with allure.step(f"Написание отзыва для товара (оценка: {rating})"):
             logger.info(f"Writing product review with rating {rating}")
             self.browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(1)
 
-            write_review_btn = self.clickable_element((By.XPATH, "//a[contains(text(),'Написать отзыв')]"))
+            write_review_btn = self.clickable_element(locators.WRITE_REVIEW_LINK)
             write_review_btn.click()
-            time.sleep(1)
+            self.wait_until_ready()
 
-            self.visible_element((By.XPATH, "//input[@placeholder='Ваше имя']")).send_keys(name)
-            self.visible_element((By.XPATH, "//textarea[@placeholder='Ваш отзыв']")).send_keys(text)
+            self.fill_form(review_form_fields(name, text, rating), keystrokes=keystrokes)
 
-            rating_inputs = self.browser.find_elements(By.XPATH, "//input[@name='rating']")
-            if len(rating_inputs) >= rating:
-                rating_inputs[rating-1].click()
+            self.screenshot("review_form_filled")
 
-            allure.attach(self.browser.get_screenshot_as_png(), 
-                         name="review_form_filled", 
-                         attachment_type=AttachmentType.PNG)
+            self.clickable_element(locators.REVIEW_CONTINUE_BUTTON).click()
 
-            self.clickable_element((By.XPATH, "//button[contains(text(),'Продолжить')]")).click()
-            
-            try:
-                success_message = WebDriverWait(self.browser, 15).until(
-                    EC.visibility_of_element_located((By.CSS_SELECTOR, "div.alert-success"))
-                ).text
-                allure.attach(self.browser.get_screenshot_as_png(), 
-                             name="review_success", 
-                             attachment_type=AttachmentType.PNG)
-                return success_message
-            except:
-                logger.warning("Форма отправлена, но сообщение не найдено")
-                return "Форма отправлена, но сообщение не найдено"
+            success_message = self.visible_element((By.CSS_SELECTOR, "div.alert-success")).text
+            self.screenshot("review_success")
+            return success_message
 
 class WishlistPage(BasePage):
-    def __init__(self, browser):
-        super().__init__(browser, "https://demo-opencart.ru/index.php?route=account/wishlist")
+    def __init__(self, browser, base_url=None):
+        super().__init__(browser, urls.route_url("account/wishlist", base=base_url))
     
-    def get_wishlist_items(self):
-        with allure.step("Получение списка товаров в избранном"):
-            try:
-                items = self.browser.find_elements(By.CSS_SELECTOR, "table.table tbody tr")
-                logger.info(f"Found {len(items)} items in wishlist")
-                allure.attach(self.browser.get_screenshot_as_png(), 
-                             name="wishlist_items", 
-                             attachment_type=AttachmentType.PNG)
-                return items
-            except Exception as e:
-                logger.error(f"Error getting wishlist items: {str(e)}")
-                return []
+    @resilience.idempotent_step
+    def get_wishlist_records(self):
+        # Пустой список желаний не ждём: строки либо уже есть, либо их нет
+        with allure.step("Получение данных товаров в избранном"):
+            records = self.extract_rows("table.table tbody tr", {
+                "name": ["td.text-left a", "text"],
+                "price": [".price", "price"],
+                "link": ["td.text-left a", "href"],
+            })
+            logger.info(f"Found {len(records)} items in wishlist")
+            self.screenshot("wishlist_items")
+            return records
+
+class CartPage(BasePage):
+    def __init__(self, browser, base_url=None):
+        super().__init__(browser, urls.route_url("checkout/cart", base=base_url))
+
+    @resilience.idempotent_step
+    def get_cart_records(self):
+        with allure.step("Получение содержимого корзины"):
+            records = self.extract_rows("form .table-responsive table tbody tr", {
+                "name": ["td.text-left a", "text"],
+                "price": ["td.text-right:nth-last-child(2)", "price"],
+                "link": ["td.text-left a", "href"],
+                "quantity": ["input[name^='quantity']", "value"],
+                "total": ["td.text-right:last-child", "price"],
+            })
+            logger.info(f"Found {len(records)} items in cart")
+            self.screenshot("cart_items")
+            return records
+
+    @resilience.idempotent_step
+    def get_totals(self):
+        # Строки итогов: {"Сумма:": "...", "Итого:": "..."}
+        rows = self.extract_rows(".col-sm-offset-8 table tr", {
+            "label": ["td:first-child", "text"],
+            "value": ["td:last-child", "text"],
+        })
+        return {row["label"]: row["value"] for row in rows}
+
 
 class RegisterPage(BasePage):
     def __init__(self, browser):
         super().__init__(browser, browser.current_url)
 
-    def register_user(self, firstname, lastname, email, telephone, password):
+    def register_user(self, firstname, lastname, email, telephone, password, keystrokes=False):
         with allure.step(f"Регистрация пользователя {firstname} {lastname}"):
             logger.info(f"Registering user with email: {email}")
-            self.visible_element((By.ID, "input-firstname")).send_keys(firstname)
-            self.visible_element((By.ID, "input-lastname")).send_keys(lastname)
-            self.visible_element((By.ID, "input-email")).send_keys(email)
-            self.visible_element((By.ID, "input-telephone")).send_keys(telephone)
-            self.visible_element((By.ID, "input-password")).send_keys(password)
-            self.visible_element((By.ID, "input-confirm")).send_keys(password)
+            self.fill_form({
+                (By.ID, "input-firstname"): firstname,
+                (By.ID, "input-lastname"): lastname,
+                (By.ID, "input-email"): email,
+                (By.ID, "input-telephone"): telephone,
+                (By.ID, "input-password"): password,
+                (By.ID, "input-confirm"): password,
+                (By.NAME, "agree"): True,
+            }, keystrokes=keystrokes)
             
-            privacy_policy = self.clickable_element((By.NAME, "agree"))
-            self.browser.execute_script("arguments[0].click();", privacy_policy)
-            
-            allure.attach(self.browser.get_screenshot_as_png(), 
-                         name="registration_form_filled", 
-                         attachment_type=AttachmentType.PNG)
+            self.screenshot("registration_form_filled")
+
+            continue_button = self.clickable_element(locators.REGISTER_CONTINUE_BUTTON)
+            # Адрес не проверяется: при ошибке валидации форма вернётся на регистрацию
+            self.click_to_navigate(continue_button)
 
-            continue_button = self.clickable_element((By.XPATH, "//input[@value='Продолжить']"))
-            continue_button.click()
-            
             return SuccessRegisterPage(self.browser)
 
 
 class SuccessRegisterPage(BasePage):
     def __init__(self, browser):
         super().__init__(browser, browser.current_url)
-        WebDriverWait(self.browser, 15).until(
-            EC.url_contains("route=account/success")
-        )
+        self.wait_for(EC.url_contains("route=account/success"), key="SuccessRegisterPage.url")
 
+    @resilience.idempotent_step
     def get_success_message(self):
         with allure.step("Получение сообщения об успешной регистрации"):
-            message = WebDriverWait(self.browser, 15).until(
-                EC.visibility_of_element_located((By.XPATH, "//div[@id='content']/h1"))
-            ).text
+            message = self.visible_element(locators.SUCCESS_HEADING).text
             logger.info(f"Registration success message: {message}")
-            allure.attach(self.browser.get_screenshot_as_png(), 
-                         name="registration_success", 
-                         attachment_type=AttachmentType.PNG)
+            self.screenshot("registration_success")
             return message
 
 
@@ -249,36 +520,46 @@ class SearchResultsPage(BasePage):
     def __init__(self, browser):
         super().__init__(browser, browser.current_url)
 
+    @resilience.idempotent_step
     def get_page_title(self):
-        try:
-            title = self.visible_element((By.TAG_NAME, "h1")).text
-            logger.info(f"Search results page title: {title}")
-            return title
-        except Exception as e:
-            logger.warning(f"Could not get page title: {str(e)}")
-            return ""
-
-    def get_products(self):
-        products = self.browser.find_elements(By.CSS_SELECTOR, ".product-thumb")
-        logger.info(f"Found {len(products)} products in search results")
-        return products
-
-
-@pytest.fixture
-def browser():
-    with allure.step("Инициализация браузера"):
-        options = webdriver.FirefoxOptions()
-        options.add_argument("--width=1920")
-        options.add_argument("--height=1080")
-        driver = webdriver.Firefox(options=options)
-        driver.implicitly_wait(10)
-        logger.info("Browser initialized")
-        yield driver
-        with allure.step("Закрытие браузера"):
-            driver.quit()
-            logger.info("Browser closed")
+        title = self.visible_element((By.TAG_NAME, "h1")).text
+        logger.info(f"Search results page title: {title}")
+        return title
+
+    @resilience.idempotent_step
+    def get_product_records(self):
+        self.wait_until_ready()
+        records = self.extract_rows(".product-thumb", {
+            "name": [".caption h4 a", "text"],
+            "price": ["p.price", "price"],
+            "link": [".caption h4 a", "href"],
+        })
+        logger.info(f"Found {len(records)} products in search results")
+        return records
+
+
+def assert_cart(cart_page, expected, expected_total=None):
+    items = cart_page.get_cart_records()
+    contents = {item["name"]: int(item["quantity"]) for item in items}
+    assert contents == expected, f"Expected cart {expected}, got {contents}"
+
+    for item in items:
+        row_total = parse_price(item["price"]) * int(item["quantity"])
+        assert parse_price(item["total"]) == pytest.approx(row_total), \
+            f"Wrong row total for '{item['name']}': {item['total']}"
+
+    totals = cart_page.get_totals()
+    assert "Итого:" in totals, f"Cart total not found, got rows {list(totals)}"
+    grand_total = parse_price(totals["Итого:"])
+    assert grand_total == pytest.approx(sum(parse_price(item["total"]) for item in items)), \
+        f"Cart total {totals['Итого:']} does not match the sum of rows"
+    if expected_total is not None:
+        assert grand_total == pytest.approx(expected_total), \
+            f"Expected cart total {expected_total}, got {totals['Итого:']}"
+
 
 @allure.feature("Тестирование функционала товаров")
+@pytest.mark.full_render
 def test_product_screenshots_switching(browser):
     with allure.step("Тест переключения превью изображений товара"):
         home_page = HomePage(browser)
@@ -293,6 +574,7 @@ def test_product_screenshots_switching(browser):
         product_page.click_all_thumbnails()
 
 @allure.feature("Тестирование навигации")
+@pytest.mark.interactive
 def test_empty_pc_category_via_menu(browser):
     with allure.step("Тест навигации в пустую категорию PC"):
         home_page = HomePage(browser)
@@ -300,15 +582,8 @@ def test_empty_pc_category_via_menu(browser):
         
         home_page.open_pc_category()
         
-        WebDriverWait(browser, 15).until(
-            EC.url_contains("path=20_26")
-        )
-        time.sleep(2)
-
-def generate_random_email():
-    letters = string.ascii_lowercase
-    username = ''.join(random.choice(letters) for _ in range(8))
-    return f"{username}@example.com"
+        home_page.wait_for(EC.url_contains("path=20_26"))
+        home_page.wait_until_ready()
 
 @allure.feature("Тестирование регистрации пользователей")
 def test_user_registration(browser):
@@ -324,7 +599,8 @@ def test_user_registration(browser):
             lastname="Петров",
             email=test_email,
             telephone="+79123456789",
-            password="TestPassword123"
+            password="TestPassword123",
+            keystrokes=True
         )
         
         success_message = success_page.get_success_message()
@@ -340,35 +616,21 @@ def test_search_product(browser):
         search_query = "iPhone"
         search_results = home_page.search_product(search_query)
         
-        WebDriverWait(browser, 15).until(
-            EC.url_contains("search=" + search_query)
-        )
+        search_results.wait_for(EC.url_contains("search=" + search_query))
         
-        try:
-            assert search_query in search_results.get_page_title()
-        except:
-            pass
+        page_title = search_results.get_page_title()
+        assert search_query in page_title, f"Expected '{search_query}' in search page title, got '{page_title}'"
         
-        products = search_results.get_products()
+        products = search_results.get_product_records()
         assert len(products) > 0
 
 @allure.feature("Тестирование избранного")
-def test_add_product_to_wishlist(browser):
+def test_add_product_to_wishlist(authenticated_browser):
+    browser = authenticated_browser
     with allure.step("Тест добавления товара в избранное"):
         home_page = HomePage(browser)
         home_page.open()
         
-        register_page = home_page.go_to_register_page()
-        
-        test_email = generate_random_email()
-        success_page = register_page.register_user(
-            firstname="Иван",
-            lastname="Петров",
-            email=test_email,
-            telephone="+79123456789",
-            password="TestPassword123"
-        )
-        
         search_query = "iPhone"
         search_results = home_page.search_product(search_query)
         
@@ -380,78 +642,36 @@ def test_add_product_to_wishlist(browser):
         
         product_page.add_to_wishlist()
         
-        browser.get("https://demo-opencart.ru/index.php?route=account/wishlist")
         wishlist_page = WishlistPage(browser)
+        wishlist_page.open()
         
-        wishlist_items = wishlist_page.get_wishlist_items()
+        wishlist_items = wishlist_page.get_wishlist_records()
         assert len(wishlist_items) == 1, f"Expected 1 item in wishlist, got {len(wishlist_items)}"
 
-        item_name = wishlist_items[0].find_element(By.CSS_SELECTOR, "td.text-left a").text
+        item_name = wishlist_items[0]["name"]
         assert product_name in item_name, f"Expected '{product_name}' in wishlist, got '{item_name}'"
 
 @allure.feature("Тестирование корзины")
-def test_add_camera_to_cart(browser):
-    with allure.step("Тест добавления камеры в корзину"):
-        home_page = HomePage(browser)
-        home_page.open()
-        
-        search_query = "Nikon D300"
-        search_results = home_page.search_product(search_query)
-        
-        product_name = "Nikon D300"
-        product_page = home_page.go_to_product_page(product_name)
+def test_add_product_to_cart(browser, product_urls, cart_case):
+    product_name, quantity = cart_case["product"], cart_case["quantity"]
+    with allure.step(f"Тест добавления в корзину: {product_name} x{quantity}"):
+        product_page = ProductPage(browser, product_urls(product_name))
+        product_page.open()
+        product_page.add_to_cart(quantity=quantity)
 
-        quantity_input = product_page.clickable_element((By.CSS_SELECTOR, "input[name='quantity']"))
-        quantity_input.clear()
-        quantity_input.send_keys("3")
-        
-        add_to_cart_button = product_page.clickable_element((By.CSS_SELECTOR, "button#button-cart"))
-        add_to_cart_button.click()
-        
-        time.sleep(2)
-        allure.attach(browser.get_screenshot_as_png(), 
-                     name="product_added_to_cart", 
-                     attachment_type=AttachmentType.PNG)
+        cart_page = CartPage(browser)
+        cart_page.open()
+        assert_cart(cart_page, cart_case["expected"], cart_case.get("total"))
 
-@allure.feature("Тестирование корзины")
-def test_add_lebtop_to_cart(browser):
-    with allure.step("Тест добавления ноутбука в корзину"):
-        home_page = HomePage(browser)
-        home_page.open()
-        
-        search_query = "Samsung Galaxy Tab 10.1"
-        search_results = home_page.search_product(search_query)
-        
-        product_name = "Samsung Galaxy Tab 10.1"
-        product_page = home_page.go_to_product_page(product_name)
-        
-        add_to_cart_button = product_page.clickable_element((By.CSS_SELECTOR, "button#button-cart"))
-        add_to_cart_button.click()
-        
-        time.sleep(2)
-        allure.attach(browser.get_screenshot_as_png(), 
-                     name="lebtop_added_to_cart", 
-                     attachment_type=AttachmentType.PNG)
 
 @allure.feature("Тестирование корзины")
-def test_add_htc_to_cart(browser):
-    with allure.step("Тест добавления телефона HTC в корзину"):
-        home_page = HomePage(browser)
-        home_page.open()
-        
-        search_query = "HTC"
-        search_results = home_page.search_product(search_query)
-        
-        product_name = "HTC"
-        product_page = home_page.go_to_product_page(product_name)
-        
-        add_to_cart_button = product_page.clickable_element((By.CSS_SELECTOR, "button#button-cart"))
-        add_to_cart_button.click()
-        
-        time.sleep(2)
-        allure.attach(browser.get_screenshot_as_png(), 
-                     name="htc_added_to_cart", 
-                     attachment_type=AttachmentType.PNG)
+def test_cart_restored_from_snapshot(browser, session_snapshot):
+    # Снимок общий для всех тестов, поэтому тест корзину только читает
+    with allure.step("Тест корзины, восстановленной из снимка сессии"):
+        session_snapshot("cart with Nikon D300 x3")
+        cart_page = CartPage(browser)
+        cart_page.open()
+        assert_cart(cart_page, {"Nikon D300": 3})
 
 @allure.feature("Тестирование отзывов")
 def test_write_product_review(browser):
@@ -466,42 +686,23 @@ def test_write_product_review(browser):
         assert product_name in product_title, f"Expected '{product_name}' in title, got '{product_title}'"
         
         browser.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(1)
         
-        write_review_button = product_page.clickable_element((By.XPATH, "//a[contains(text(),'Написать отзыв')]"))
+        write_review_button = product_page.clickable_element(locators.WRITE_REVIEW_LINK)
         write_review_button.click()
-        time.sleep(1)  
-        
-        name_field = product_page.visible_element((By.XPATH, "//input[@name='name']"))
-        name_field.send_keys("Тестовый Пользователь")
+        product_page.wait_until_ready()
         
-        review_field = product_page.visible_element((By.XPATH, "//textarea[@name='text']"))
-        review_field.send_keys("Это автоматически созданный отзыв. Товар хорошего качества!")
+        product_page.fill_form(review_form_fields(
+            name="Тестовый Пользователь",
+            text="Это автоматически созданный отзыв. Товар хорошего качества!",
+            rating=5
+        ))
         
-        rating_inputs = browser.find_elements(By.NAME, "rating")
-        if len(rating_inputs) >= 5:
-            browser.execute_script("arguments[0].scrollIntoView();", rating_inputs[4])
-            rating_inputs[4].click() 
+        take_screenshot(browser, "review_form_before_submit")
         
-        allure.attach(browser.get_screenshot_as_png(), 
-                     name="review_form_before_submit", 
-                     attachment_type=AttachmentType.PNG)
-        
-        continue_button = product_page.clickable_element((By.XPATH, "//button[contains(text(),'Продолжить')]"))
+        continue_button = product_page.clickable_element(locators.REVIEW_CONTINUE_BUTTON)
         continue_button.click()
-        
-        try:
-            success_message = WebDriverWait(browser, 15).until(
-                EC.visibility_of_element_located((By.CSS_SELECTOR, "div.alert-success"))
-            ).text
-            allure.attach(browser.get_screenshot_as_png(), 
-                         name="review_submit_success", 
-                         attachment_type=AttachmentType.PNG)
-            assert "спасибо" in success_message.lower(), \
-                f"Expected success message not found, got: '{success_message}'"
-        except Exception as e:
-            logger.error(f"Не удалось найти сообщение об успехе: {str(e)}")
-            allure.attach(browser.get_screenshot_as_png(), 
-                         name="review_submit_error", 
-                         attachment_type=AttachmentType.PNG)
-            print("Не удалось найти сообщение об успехе, но форма была заполнена")
\ No newline at end of file
+
+        success_message = product_page.visible_element((By.CSS_SELECTOR, "div.alert-success")).text
+        take_screenshot(browser, "review_submit_success")
+        assert "спасибо" in success_message.lower(), \
+            f"Expected success message not found, got: '{success_message}'"
\ No newline at end of file
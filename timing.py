@@ -0,0 +1,155 @@
+import functools
+import logging
+import os
+import threading
+from collections import defaultdict
+from time import perf_counter
+
+from allure_commons import hookimpl
+
+from jsonfile import read_json, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+
+class StepTimer:
+    # Собирает длительность шагов allure.step, время ожиданий и число
+    # обращений к WebDriver; ожидания и действия считаются раздельно.
+    def __init__(self):
+        self.records = []
+        self.commands = defaultdict(lambda: {"count": 0, "time": 0.0})
+        self.test = None
+        self._stack = []
+        self._wait_depth = 0
+        self._wait_start = 0.0
+        self._test_start = 0.0
+        self._test_totals = None
+        self._lock = threading.Lock()
+
+    def begin_test(self, nodeid):
+        self.test = nodeid
+        self._stack = []
+        self._wait_depth = 0
+        self._test_start = perf_counter()
+        self._test_totals = self._new_totals()
+
+    def end_test(self):
+        totals = self._test_totals
+        if totals is None:
+            return None
+        totals["duration"] = perf_counter() - self._test_start
+        result = {"test": self.test, **self._rounded(totals),
+                  "steps": [record for record in self.records if record["test"] == self.test]}
+        self._test_totals = None
+        return result
+
+    @hookimpl
+    def start_step(self, uuid, title, params):
+        self._stack.append({"uuid": uuid, "title": title, "start": perf_counter(), **self._new_totals()})
+
+    @hookimpl
+    def stop_step(self, uuid, exc_type, exc_val, exc_tb):
+        if not self._stack or self._stack[-1]["uuid"] != uuid:
+            return
+        path = " / ".join(step["title"] for step in self._stack)
+        step = self._stack.pop()
+        step["duration"] = perf_counter() - step["start"]
+        with self._lock:
+            self.records.append({"test": self.test, "step": path, "failed": exc_type is not None,
+                                 **self._rounded(step)})
+
+    def wait_started(self):
+        if self._wait_depth == 0:
+            self._wait_start = perf_counter()
+        self._wait_depth += 1
+
+    def wait_finished(self):
+        self._wait_depth -= 1
+        if self._wait_depth == 0:
+            self._add("wait_time", perf_counter() - self._wait_start)
+
+    def command(self, name, duration):
+        with self._lock:
+            self.commands[name]["count"] += 1
+            self.commands[name]["time"] += duration
+        self._add("command_count", 1)
+        self._add("command_time", duration)
+        if self._wait_depth == 0:
+            self._add("action_time", duration)
+
+    def summary(self, tests):
+        return {
+            "tests": tests,
+            "commands": {name: {"count": stats["count"], "time": round(stats["time"], 4)}
+                         for name, stats in sorted(self.commands.items())},
+            "steps": self.records,
+        }
+
+    def _add(self, field, value):
+        for totals in self._stack:
+            totals[field] += value
+        if self._test_totals is not None:
+            self._test_totals[field] += value
+
+    def _new_totals(self):
+        return {"wait_time": 0.0, "action_time": 0.0, "command_time": 0.0, "command_count": 0}
+
+    def _rounded(self, totals):
+        fields = ("duration", "wait_time", "action_time", "command_time", "command_count")
+        return {field: round(totals[field], 4) if isinstance(totals[field], float) else totals[field]
+                for field in fields if field in totals}
+
+
+timer = StepTimer()
+
+
+def timed_wait(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        timer.wait_started()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            timer.wait_finished()
+    return wrapper
+
+
+def instrument(driver):
+    # Все команды WebDriver проходят через driver.execute
+    execute = driver.execute
+
+    def timed_execute(driver_command, params=None):
+        start = perf_counter()
+        try:
+            return execute(driver_command, params)
+        finally:
+            timer.command(driver_command, perf_counter() - start)
+
+    driver.execute = timed_execute
+    return driver
+
+
+def slowest(steps, count):
+    return sorted(steps, key=lambda step: step["duration"], reverse=True)[:count]
+
+
+def write_summary(path, summary):
+    write_json_atomic(path, summary, indent=2)
+
+
+def merge_summaries(path, worker_paths):
+    merged = {"tests": {}, "commands": {}, "steps": []}
+    for worker_path in worker_paths:
+        # Недописанный файл воркера (например, после его падения) пропускается
+        summary = read_json(worker_path)
+        os.remove(worker_path)
+        if summary is None:
+            continue
+        merged["tests"].update(summary["tests"])
+        merged["steps"].extend(summary["steps"])
+        for name, stats in summary["commands"].items():
+            total = merged["commands"].setdefault(name, {"count": 0, "time": 0.0})
+            total["count"] += stats["count"]
+            total["time"] = round(total["time"] + stats["time"], 4)
+    write_summary(path, merged)
+    return merged
@@ -0,0 +1,22 @@
+import os
+from urllib.parse import urlencode, urlsplit
+
+DEFAULT_BASE_URL = os.environ.get("OPENCART_BASE_URL", "https://demo-opencart.ru/")
+
+base_url = DEFAULT_BASE_URL
+# Постоянное имя магазина для файлов с историей: локальная заглушка и прокси
+# получают случайный порт, поэтому их адрес для этого не годится
+shop_id = urlsplit(DEFAULT_BASE_URL).netloc
+
+
+def configure(url, shop=None):
+    global base_url, shop_id
+    base_url = url if url.endswith("/") else f"{url}/"
+    shop_id = shop or urlsplit(base_url).netloc
+    return base_url
+
+
+def route_url(route, base=None, **params):
+    query = urlencode(params)
+    url = f"{base or base_url}index.php?route={route}"
+    return f"{url}&{query}" if query else url
@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+
+import benchmark
+import urls
+from jsonfile import read_json, write_json_atomic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = 15
+FIRST_POLL = 0.05
+MAX_POLL = 0.5
+BACKOFF = 1.5
+
+# Выученный таймаут: запас над p95 прошлых ожиданий, но не меньше LEARNED_FLOOR
+# и не больше таймаута, заданного вызывающим кодом
+LEARNED_FACTOR = 3
+LEARNED_FLOOR = 2.0
+MIN_SAMPLES = 5
+HISTORY_SIZE = 50
+
+IGNORED_EXCEPTIONS = (NoSuchElementException, StaleElementReferenceException)
+
+
+class WaitEngine:
+    # Явные ожидания без implicitly_wait: опрос начинается с FIRST_POLL и
+    # замедляется до MAX_POLL, а для ожиданий с ключом таймаут подбирается
+    # по истории успешных ожиданий того же локатора в том же магазине:
+    # локальная заглушка отвечает за миллисекунды, и её история не должна
+    # урезать таймауты для удалённого демо.
+    def __init__(self, default_timeout=DEFAULT_TIMEOUT, first_poll=FIRST_POLL, max_poll=MAX_POLL,
+                 backoff=BACKOFF):
+        self.default_timeout = default_timeout
+        self.first_poll = first_poll
+        self.max_poll = max_poll
+        self.backoff = backoff
+        self.history = defaultdict(lambda: defaultdict(list))
+        self._lock = threading.Lock()
+
+    def timeout_for(self, key, timeout=None):
+        timeout = timeout or self.default_timeout
+        samples = self.history[urls.shop_id].get(key) if key else None
+        if not samples or len(samples) < MIN_SAMPLES:
+            return timeout
+        learned = max(LEARNED_FLOOR, benchmark.percentile(samples, 95) * LEARNED_FACTOR)
+        return min(timeout, learned)
+
+    def until(self, driver, condition, timeout=None, key=None, message=""):
+        timeout = self.timeout_for(key, timeout)
+        start = time.monotonic()
+        interval = self.first_poll
+        while True:
+            try:
+                value = condition(driver)
+                if value:
+                    self.record(key, time.monotonic() - start)
+                    return value
+            except IGNORED_EXCEPTIONS:
+                pass
+            elapsed = time.monotonic() - start
+            if elapsed >= timeout:
+                raise TimeoutException(f"{message or key or condition} не выполнено за {timeout:.1f}s")
+            time.sleep(min(interval, timeout - elapsed))
+            interval = min(self.max_poll, interval * self.backoff)
+
+    def absent(self, driver, locator):
+        # Отсутствие элемента проверяется одним запросом: без неявного
+        # ожидания find_elements возвращает пустой список сразу
+        return not driver.find_elements(*locator)
+
+    def record(self, key, duration):
+        if not key:
+            return
+        with self._lock:
+            samples = self.history[urls.shop_id][key]
+            samples.append(round(duration, 4))
+            del samples[:-HISTORY_SIZE]
+
+    def load(self, path):
+        stored = read_json(path)
+        if not isinstance(stored, dict):
+            return
+        with self._lock:
+            for shop, keys in stored.items():
+                if not isinstance(keys, dict):
+                    continue
+                for key, samples in keys.items():
+                    current = self.history[shop].get(key, [])
+                    self.history[shop][key] = (samples + current)[-HISTORY_SIZE:]
+        logger.info(f"Loaded wait history for {len(stored)} shops from {path}")
+
+    def save(self, path):
+        # Перед записью подмешиваем историю, которую успели сохранить другие воркеры
+        stored = read_json(path, {})
+        with self._lock:
+            for shop, keys in self.history.items():
+                if not isinstance(stored.get(shop), dict):
+                    stored[shop] = {}
+                for key, samples in keys.items():
+                    stored[shop][key] = samples[-HISTORY_SIZE:]
+        write_json_atomic(path, stored, indent=2, sort_keys=True)
+
+
+engine = WaitEngine()
+
+
+def wait_key(page, kind, locator):
+    name = getattr(locator, "name", None) or "=".join(locator)
+    return f"{page}.{kind} {name}"